@@ -0,0 +1,153 @@
+# alignment.py
+"""
+Transcript-to-slide timeline alignment.
+
+The timestamped transcript segments and the text of each slide are turned
+into TF-IDF vectors, compared all at once as a cosine similarity matrix, and
+aligned with a monotonic dynamic-time-warping pass: the talk moves through
+the slides in order, one segment at a time, and every slide is discussed at
+least once. The result is an estimate of when each slide was on screen and
+its share of the speaking time. Everything is vectorized per transcript row,
+so a pitch aligns in a few milliseconds.
+
+The recognizer gives no timestamps, so segment times are spread by word
+count. Words per minute would then be the same on every slide, and pacing
+would only mirror word counts, so neither is reported.
+"""
+import re
+
+import numpy as np
+
+from revisions import split_transcript
+
+# Speaking rate used to place segments in time when the recording length is unknown
+DEFAULT_WORDS_PER_MINUTE = 150
+
+_WORD_RE = re.compile(r"[a-z0-9$%]+(?:[.,][0-9]+)?")
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i in is it its of on or our so that the their these they this
+to was we were what which will with you your us let me my not just can into than then there here also
+""".split())
+
+
+def _tokens(text):
+    return [word for word in _WORD_RE.findall((text or "").lower()) if word not in _STOPWORDS]
+
+
+def timed_segments(transcript, duration=None):
+    """
+    Split a transcript into (start, end, text) segments.
+    Without timestamps from the recognizer, time is spread over the segments in proportion
+    to their word counts, across the recording duration when it is known.
+    """
+    texts = split_transcript(transcript)
+    words = np.array([max(1, len(text.split())) for text in texts], dtype=float)
+    if duration is None:
+        duration = words.sum() / DEFAULT_WORDS_PER_MINUTE * 60
+    ends = np.cumsum(words) / words.sum() * duration if texts else np.array([])
+    starts = np.concatenate(([0.0], ends[:-1])) if texts else np.array([])
+    return [(float(start), float(end), text) for start, end, text in zip(starts, ends, texts)]
+
+
+def similarity_matrix(segment_texts, slide_texts):
+    """Cosine similarity of TF-IDF vectors, one row per segment and one column per slide."""
+    documents = [_tokens(text) for text in list(segment_texts) + list(slide_texts)]
+    vocabulary = {}
+    rows, columns = [], []
+    for row, tokens in enumerate(documents):
+        for token in tokens:
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    counts = np.zeros((len(documents), max(1, len(vocabulary))))
+    np.add.at(counts, (np.array(rows, dtype=int), np.array(columns, dtype=int)), 1)
+    tf = np.log1p(counts)
+    idf = np.log((1 + len(documents)) / (1 + (counts > 0).sum(axis=0))) + 1
+    vectors = tf * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    segments = vectors[:len(segment_texts)]
+    slides = vectors[len(segment_texts):]
+    return segments @ slides.T
+
+
+def dtw_path(similarity):
+    """
+    Monotonic alignment of segments (rows) to slides (columns) maximizing total similarity.
+    Each segment stays on the current slide or advances by one; returns the slide index per segment.
+    """
+    cost = 1.0 - similarity
+    n_segments, n_slides = cost.shape
+    total = np.full((n_segments, n_slides), np.inf)
+    advanced = np.zeros((n_segments, n_slides), dtype=bool)
+    total[0, 0] = cost[0, 0]
+    for i in range(1, n_segments):
+        stay = total[i - 1]
+        advance = np.concatenate(([np.inf], total[i - 1, :-1]))
+        advanced[i] = advance < stay
+        total[i] = cost[i] + np.minimum(stay, advance)
+
+    # Finish on the last slide when there are enough segments to reach it
+    slide = n_slides - 1 if n_segments >= n_slides else int(np.argmin(total[-1]))
+    path = np.empty(n_segments, dtype=int)
+    for i in range(n_segments - 1, -1, -1):
+        path[i] = slide
+        if i and advanced[i, slide]:
+            slide -= 1
+    return path
+
+
+def align_transcript(slides, transcript, duration=None, rubric=None):
+    """
+    Estimate when each slide was discussed.
+    Returns {"duration", "target_seconds", "slides": [...]} with start, end, seconds and words
+    for each slide, or None when there is nothing to align. Times are estimated from word counts.
+    """
+    segments = timed_segments(transcript, duration)
+    if len(slides) < 2 or not segments:
+        return None
+
+    path = dtw_path(similarity_matrix([text for _, _, text in segments], slides))
+    starts = np.array([start for start, _, _ in segments])
+    ends = np.array([end for _, end, _ in segments])
+    words = np.array([len(text.split()) for _, _, text in segments], dtype=float)
+
+    # Per-slide totals in one pass over the path
+    seconds = np.bincount(path, weights=ends - starts, minlength=len(slides))
+    word_counts = np.bincount(path, weights=words, minlength=len(slides))
+    slide_sections = {section["slide"]: section["id"] for section in rubric.sections if section.get("slide")} if rubric else {}
+    total_duration = float(ends[-1])
+    target = total_duration / len(slides)
+    if rubric and rubric.duration_minutes:
+        target = rubric.duration_minutes * 60 / max(len(slides), rubric.slide_count or len(slides))
+
+    timeline = []
+    for index in range(len(slides)):
+        on_slide = np.flatnonzero(path == index)
+        timeline.append({
+            "slide": index + 1,
+            "section": slide_sections.get(index + 1),
+            "start": float(starts[on_slide[0]]) if on_slide.size else None,
+            "end": float(ends[on_slide[-1]]) if on_slide.size else None,
+            "seconds": round(float(seconds[index]), 1),
+            "words": int(word_counts[index]),
+        })
+
+    return {"duration": round(total_duration, 1), "target_seconds": round(target, 1), "slides": timeline}
+
+
+def format_timeline(timeline):
+    """Plain-text summary of a slide timeline for the evaluation prompt."""
+    lines = [f"Recording length: {int(timeline['duration'] // 60)}:{int(timeline['duration'] % 60):02d}; "
+             f"target per slide: about {timeline['target_seconds']:.0f} seconds; "
+             f"times per slide are estimated from word counts, not measured"]
+    for slide in timeline["slides"]:
+        if slide["start"] is None:
+            lines.append(f"- Slide {slide['slide']}: not discussed")
+            continue
+        lines.append(
+            f"- Slide {slide['slide']}: about {slide['start']:.0f}s-{slide['end']:.0f}s, "
+            f"{slide['seconds']:.0f} seconds, {slide['words']} words"
+        )
+    return "\n".join(lines)
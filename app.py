@@ -9,6 +9,9 @@ import json
 import time
 from datetime import datetime
 import tempfile
+import threading
+import uuid
+from functools import partial
 import matplotlib.pyplot as plt
 import seaborn as sns
 from PIL import Image
@@ -20,6 +23,20 @@ import fitz  # PyMuPDF
 import re
 import requests
 import anthropic
+from alignment import align_transcript
+from dedup import compute_signature, get_submission_index
+from rubric import available_rubrics, load_rubric
+from evaluator import cascade_stats
+from scheduler import get_scheduler
+from thumbnails import file_digest, get_renderer
+from probe import probe_audio, probe_presentation
+from pipeline import (
+    analyze_presentation_fallback,
+    evaluate_presentation,
+    evaluate_revision,
+    extract_audio_transcript,
+    extract_presentation_slides,
+)
 
 # Set page configuration
 st.set_page_config(
@@ -138,80 +155,18 @@ if 'evaluation_results' not in st.session_state:
 if 'current_section' not in st.session_state:
     st.session_state.current_section = 'problem'
 
-# Helper functions
-def extract_text_from_docx(file):
-    """Extract text from a DOCX file."""
-    doc = docx.Document(file)
-    full_text = []
-    for para in doc.paragraphs:
-        full_text.append(para.text)
-    return '\n'.join(full_text)
-
-def extract_text_from_pdf(file):
-    """Extract text from a PDF file."""
-    pdf_file = fitz.open(stream=file.read(), filetype="pdf")
-    text = ""
-    for page_num in range(len(pdf_file)):
-        page = pdf_file[page_num]
-        text += page.get_text()
-    return text
-
-def extract_text_from_pptx(file):
-    """Extract text from a PPTX file."""
-    prs = pptx.Presentation(file)
-    text = []
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                text.append(shape.text)
-    return '\n'.join(text)
-
-def extract_audio_transcript(audio_file, file_extension):
-    """Extract transcript from audio file."""
-    # For demonstration, we'll return a mock transcript
-    # In a real application, you'd use speech_recognition or another API
-    # to actually transcribe the audio
-    
-    # This would be the real implementation:
-    # with tempfile.NamedTemporaryFile(suffix=file_extension) as temp_audio:
-    #     temp_audio.write(audio_file.read())
-    #     temp_audio.flush()
-    #     
-    #     # Convert to wav if needed
-    #     if file_extension != '.wav':
-    #         sound = AudioSegment.from_file(temp_audio.name, format=file_extension[1:])
-    #         wav_path = temp_audio.name.replace(file_extension, '.wav')
-    #         sound.export(wav_path, format='wav')
-    #         audio_path = wav_path
-    #     else:
-    #         audio_path = temp_audio.name
-    #     
-    #     # Use speech recognition
-    #     recognizer = sr.Recognizer()
-    #     with sr.AudioFile(audio_path) as source:
-    #         audio_data = recognizer.record(source)
-    #         transcript = recognizer.recognize_google(audio_data)
-    #         return transcript
-    
-    # For demo purposes, return a mock transcript based on the sample in the instructions
-    return """Good afternoon, everyone. I'm here to talk about a problem that's been plaguing businesses and individuals alike - the inefficiency of current widgets in the market. These widgets, which are supposed to make our lives easier, are instead causing us to waste precious time and resources. In fact, 70% of users have reported dissatisfaction with these widgets, and businesses are losing an average of 20 hours per week due to their inefficiency.
-
-But what if I told you we have a solution? A solution that not only addresses this problem but does so in a way that saves time and resources. We've developed a new kind of widget, one that's designed for maximum efficiency. Our early testing shows that it reduces time wasted by 50%, and we've seen a 95% satisfaction rate among our test users.
-
-Let me paint a picture for you. Imagine a business that's currently losing 20 hours a week due to widget inefficiency. With our new widget, they could potentially save 10 hours a week. That's 10 hours that could be spent on more productive tasks, leading to increased output and profits.
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
 
-Our business model is simple and effective. We sell our widgets directly to businesses and individuals. By providing a product that offers real value and saves time, we're confident that our widgets will be in high demand. In fact, our market research shows a potential customer base of 1 million users.
+if 'background_evaluation' not in st.session_state:
+    st.session_state.background_evaluation = None
 
-Let's talk numbers. We project gross sales of $5 million in the first year, based on an estimated 500,000 transactions. The cost of producing these widgets is $2 million, leaving us with a gross margin of $3 million. After accounting for fixed costs of $1 million, we're looking at a net profit margin of $2 million.
+if 'presentation' not in st.session_state:
+    st.session_state.presentation = None
 
-In conclusion, we're offering a solution to a widespread problem, with a compelling business model and sustainable finances. We're not just selling widgets - we're selling efficiency, time savings, and satisfaction. Thank you for your time, and I look forward to your questions."""
-
-def analyze_presentation_with_claude(presentation_text, transcript):
-    """
-    Analyze the presentation content using Claude API to provide intelligent assessment
-    and detailed feedback on the pitch.
-    """
-    # Initialize Claude client from environment variable or Streamlit secrets
+# Helper functions
+def get_claude_client():
+    """Create the Claude client from Streamlit secrets or the environment; stops the app if no key is set."""
     # You can store your API key in Streamlit's secrets.toml file
     if 'CLAUDE_API_KEY' in st.secrets:
         api_key = st.secrets['CLAUDE_API_KEY']
@@ -222,278 +177,173 @@ def analyze_presentation_with_claude(presentation_text, transcript):
         st.error("Claude API key not found. Please set the CLAUDE_API_KEY environment variable or add it to your secrets.toml file.")
         st.stop()
         
-    client = anthropic.Anthropic(api_key=api_key)
-    
-    # Prepare the prompt with the presentation text and transcript
-    prompt = f"""
-    You are an expert at evaluating business pitches. You need to provide a comprehensive evaluation of a 4-minute pitch presentation based on its content.
-    
-    Here are the evaluation criteria for a 4-minute business pitch:
-    
-    1. Problem Framing (25%): 
-       - Clearly identifies a significant problem with compelling statistics and examples
-       - Uses statistics to demonstrate scale (e.g., 70% user dissatisfaction)
-       - Shows impact (e.g., businesses lose 20 hours per week)
-       - Explains who is affected
-    
-    2. Solution Framing (25%):
-       - Solution directly addresses identified problem
-       - Provides evidence of effectiveness (e.g., 50% time reduction, 95% satisfaction)
-       - Explains how solution works and its benefits
-       - Compares with alternatives or existing solutions
-    
-    3. Business Model (20%):
-       - Clear explanation of how the business makes money
-       - Shows market demand and customer base (e.g., 1 million potential users)
-       - Explains value proposition alignment
-       - Outlines customer acquisition strategy
-    
-    4. Financial Overview (20%):
-       - Includes gross sales projections (e.g., $5 million)
-       - Provides transaction estimates (e.g., 500,000)
-       - Shows COGS ($2 million), gross margin ($3 million)
-       - Details fixed costs ($1 million) and net profit ($2 million)
-    
-    5. Delivery & Impact (10%):
-       - Clear and concise delivery within 4-minute limit
-       - Effective use of slides and visual aids
-       - Verbal clarity and engagement
-       - Strong conclusion and call to action
-    
-    Below is the content from a pitch presentation and its transcript. Please evaluate it based on the criteria above.
-    
-    PRESENTATION CONTENT:
-    {presentation_text}
-    
-    PITCH TRANSCRIPT:
-    {transcript}
-    
-    Please provide:
-    1. Scores for each section (0-100)
-    2. Specific feedback for each section
-    3. An overall score (weighted according to the percentages)
-    4. Areas of strength
-    5. Suggestions for improvement
-    
-    Format your response as a JSON object with this structure:
-    {{
-        "overall": [overall score],
-        "sections": {{
-            "problem": {{
-                "score": [score],
-                "feedback": [specific feedback],
-                "strengths": [list of strengths],
-                "improvements": [list of suggestions]
-            }},
-            "solution": {{
-                "score": [score],
-                "feedback": [specific feedback],
-                "strengths": [list of strengths],
-                "improvements": [list of suggestions]
-            }},
-            "businessModel": {{
-                "score": [score],
-                "feedback": [specific feedback],
-                "strengths": [list of strengths],
-                "improvements": [list of suggestions]
-            }},
-            "financials": {{
-                "score": [score],
-                "feedback": [specific feedback],
-                "strengths": [list of strengths],
-                "improvements": [list of suggestions]
-            }},
-            "delivery": {{
-                "score": [score],
-                "feedback": [specific feedback],
-                "strengths": [list of strengths],
-                "improvements": [list of suggestions]
-            }}
-        }}
-    }}
-    
-    Return only the JSON object with no additional text.
+    return anthropic.Anthropic(api_key=api_key)
+
+def analyze_presentation_with_claude(presentation_text, transcript, rubric=None, queue_key="default", base_sections=None, timeline=None):
+    """
+    Analyze the presentation content using Claude API to provide intelligent assessment
+    and detailed feedback on the pitch. Calls wait their turn for shared API capacity
+    in the queue identified by queue_key. Sections in base_sections are carried over
+    from a previous revision and not re-evaluated; the slide timeline informs Delivery.
     """
+    rubric = rubric or load_rubric()
+    
+    # Initialize Claude client from environment variable or Streamlit secrets
+    client = get_claude_client()
+    
+    # Show the queue position while other sessions hold all of the API capacity
+    queue_status = st.empty()
+    
+    def show_queue_position(position, eta):
+        queue_status.info(f"⏳ Claude is busy evaluating other pitches. You are number {position} in the queue "
+                          f"(estimated wait: {eta:.0f} seconds).")
     
     try:
-        # Call Claude API with a progress indicator
-        with st.spinner("Claude is analyzing your pitch..."):
-            response = client.messages.create(
-                model="claude-3-opus-20240229",  # Use the appropriate Claude model version
-                max_tokens=4000,
-                temperature=0.1,  # Low temperature for more consistent output
-                system="You are an expert at evaluating business pitches with deep experience in entrepreneurship, venture capital, and presentation skills. Provide detailed, insightful analysis based on the specified criteria.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            # Extract the response text
-            result_text = response.content[0].text
-            
-            # Parse JSON response
-            # First, find JSON object in the response (in case Claude adds additional text)
-            json_match = re.search(r'({[\s\S]*})', result_text)
-            if json_match:
-                result_text = json_match.group(1)
-                
-            try:
-                result = json.loads(result_text)
-            except json.JSONDecodeError:
-                st.error("Error parsing Claude's response. Using fallback evaluation method.")
-                return analyze_presentation_fallback(presentation_text, transcript)
+        # Call Claude API with a progress indicator once this session is admitted
+        with get_scheduler().slot(queue_key, on_wait=show_queue_position), st.spinner("Claude is analyzing your pitch..."):
+            queue_status.empty()
             
-            # Ensure all expected fields are in the response
-            expected_sections = ["problem", "solution", "businessModel", "financials", "delivery"]
-            expected_props = ["score", "feedback"]
+            # A fast model scores first and the large model is only used near grade boundaries.
+            # The response schema is enforced with a tool call; only missing or invalid
+            # sections are re-requested, and only sections that still fail are scored locally
+            result = evaluate_presentation(
+                client, presentation_text, transcript, rubric, base_sections=base_sections, timeline=timeline
+            )
             
-            for section in expected_sections:
-                if section not in result["sections"]:
-                    result["sections"][section] = {}
-                for prop in expected_props:
-                    if prop not in result["sections"][section]:
-                        if prop == "score":
-                            result["sections"][section][prop] = 70.0
-                        else:
-                            result["sections"][section][prop] = "No specific feedback provided."
-                            
-            # Round scores to 1 decimal place
-            result["overall"] = round(float(result["overall"]), 1)
-            for section in expected_sections:
-                result["sections"][section]["score"] = round(float(result["sections"][section]["score"]), 1)
+            if result["meta"]["fallback_sections"]:
+                labels = ", ".join(rubric.section(section_id)["label"] for section_id in result["meta"]["fallback_sections"])
+                st.warning(f"Claude's response was incomplete for {labels}. Those sections use the fallback evaluation method.")
                 
             return result
             
     except Exception as e:
         st.error(f"Error calling Claude API: {str(e)}")
         # Fall back to the simpler analysis method
-        return analyze_presentation_fallback(presentation_text, transcript)
+        return analyze_presentation_fallback(presentation_text, transcript, rubric)
     
-def analyze_presentation_fallback(presentation_text, transcript):
+class EvaluationCancelled(Exception):
+    """Raised in a background evaluation that a newer evaluation has superseded."""
+    
+def start_background_evaluation(client, provisional, slides, transcript, rubric, queue_key="default",
+                                submission_key=None, on_done=None):
     """
-    Fallback analysis method if Claude API call fails.
-    Uses basic text matching and rules to generate scores and feedback.
+    Run the Claude evaluation in a background thread while the provisional local result is shown.
+    Returns a job record that the thread updates in place; the thread never calls Streamlit, and
+    the page polls the record until its "result" is ready to replace the provisional one.
+    Setting the record's "cancelled" flag stops the job before it calls Claude or stores anything.
     """
-    # Check for key components in the problem section
-    problem_indicators = [
-        "problem", "challenge", "issue", "pain point", "inefficiency",
-        "70%", "dissatisfaction", "20 hours", "wasted time"
-    ]
-    
-    # Check for key components in the solution section
-    solution_indicators = [
-        "solution", "addresses", "designed for", "efficiency",
-        "50%", "reduces time", "95% satisfaction", "test users"
-    ]
-    
-    # Check for key components in the business model section
-    business_model_indicators = [
-        "business model", "sell", "directly to", "businesses and individuals",
-        "value", "high demand", "market research", "1 million", "customer base"
-    ]
+    presentation_text = "\n".join(slides)
+    job = {"status": "queued", "position": None, "eta": None, "result": None, "error": None, "cancelled": False}
+    
+    def check_cancelled():
+        if job["cancelled"]:
+            raise EvaluationCancelled()
+    
+    def on_wait(position, eta):
+        # Raising here leaves the queue, so a superseded job doesn't hold up the one replacing it
+        check_cancelled()
+        job["position"], job["eta"] = position, eta
+    
+    def evaluate(base_sections=None):
+        check_cancelled()
+        try:
+            with get_scheduler().slot(queue_key, on_wait=on_wait):
+                check_cancelled()
+                job["status"] = "evaluating"
+                result = evaluate_presentation(client, presentation_text, transcript, rubric,
+                                               base_sections=base_sections, timeline=provisional.get("timeline"))
+        except EvaluationCancelled:
+            raise
+        except Exception as e:
+            # Same behaviour as the foreground evaluation: the local result stands
+            job["error"] = str(e)
+            result = analyze_presentation_fallback(presentation_text, transcript, rubric)
+        # Raising here keeps evaluate_revision from storing a superseded revision
+        check_cancelled()
+        return result
+    
+    def run():
+        try:
+            if submission_key:
+                result = evaluate_revision(submission_key, slides, transcript, rubric, evaluate)
+            else:
+                result = evaluate()
+            if on_done:
+                on_done(result)
+            for key in ("duplicates", "timeline"):
+                if key in provisional:
+                    result[key] = provisional[key]
+        except EvaluationCancelled:
+            job["status"] = "cancelled"
+            return
+        except Exception as e:
+            job["error"] = str(e)
+            result = {key: value for key, value in provisional.items() if key != "provisional"}
+        # Keep the provisional scores so the page can show how much each section moved
+        result["provisional_overall"] = provisional["overall"]
+        result["provisional_sections"] = {
+            section_id: section["score"] for section_id, section in provisional["sections"].items()
+        }
+        if job["error"]:
+            result["evaluation_error"] = job["error"]
+        job["result"] = result
+        job["status"] = "done"
+    
+    threading.Thread(target=run, daemon=True).start()
+    return job
+    
+def show_background_status(placeholder, job):
+    """Show the progress of a background evaluation in place, without redrawing the rest of the page."""
+    if job["status"] == "queued" and job["position"]:
+        placeholder.info(f"⏳ Provisional score from the quick local evaluation. Claude's evaluation is queued "
+                         f"(number {job['position']}, estimated wait: {job['eta']:.0f} seconds) "
+                         "and will replace it here.")
+    else:
+        placeholder.info("⏳ Provisional score from the quick local evaluation. Claude is evaluating your pitch "
+                         "and its evaluation will replace this one here.")
     
-    # Check for key components in the financial section
-    financial_indicators = [
-        "$5 million", "gross sales", "500,000 transactions", 
-        "$2 million", "cost", "gross margin", "$3 million",
-        "fixed costs", "$1 million", "net profit", "$2 million"
+def get_slide_thumbnails(slide_numbers):
+    """
+    Start rendering thumbnails of the evaluated presentation's slides (1-based) without waiting for them.
+    Returns a future of the JPEG bytes (None where unavailable) per slide, or None per slide without a presentation.
+    """
+    presentation = st.session_state.presentation
+    if not presentation:
+        return [None] * len(slide_numbers)
+    renderer = get_renderer()
+    return [
+        renderer.submit(presentation["data"], presentation["name"], number - 1, digest=presentation["digest"])
+        for number in slide_numbers
     ]
-    
-    # Count the mentions of indicators in the combined text
-    combined_text = (presentation_text + " " + transcript).lower()
-    
-    problem_score = sum(1 for indicator in problem_indicators if indicator.lower() in combined_text) / len(problem_indicators) * 100
-    solution_score = sum(1 for indicator in solution_indicators if indicator.lower() in combined_text) / len(solution_indicators) * 100
-    business_model_score = sum(1 for indicator in business_model_indicators if indicator.lower() in combined_text) / len(business_model_indicators) * 100
-    financial_score = sum(1 for indicator in financial_indicators if indicator.lower() in combined_text) / len(financial_indicators) * 100
-    
-    # For delivery, we analyze the transcript length and structure
-    words = transcript.split()
-    word_count = len(words)
-    
-    # Ideal word count for a 4-minute pitch is roughly 500-600 words
-    if 450 <= word_count <= 650:
-        delivery_score = 95  # Excellent timing
-    elif 400 <= word_count < 450 or 650 < word_count <= 700:
-        delivery_score = 85  # Good timing
-    elif 350 <= word_count < 400 or 700 < word_count <= 750:
-        delivery_score = 75  # Satisfactory timing
+
+def show_slide_preview(placeholder, future, slide_number):
+    """Show a slide thumbnail in its placeholder, or a note while it is still rendering."""
+    if not future.done():
+        placeholder.caption(f"Rendering a preview of slide {slide_number}…")
+    elif future.result():
+        placeholder.image(future.result(), caption=f"Slide {slide_number}", use_column_width=True)
     else:
-        delivery_score = 65  # Poor timing
-    
-    # Add randomness to make scores more realistic
-    import random
-    problem_score = min(100, max(60, problem_score + random.uniform(-5, 5)))
-    solution_score = min(100, max(60, solution_score + random.uniform(-5, 5)))
-    business_model_score = min(100, max(60, business_model_score + random.uniform(-5, 5)))
-    financial_score = min(100, max(60, financial_score + random.uniform(-5, 5)))
-    delivery_score = min(100, max(60, delivery_score + random.uniform(-5, 5)))
-    
-    # Calculate overall score (weighted)
-    overall_score = (
-        problem_score * 0.25 +
-        solution_score * 0.25 +
-        business_model_score * 0.20 +
-        financial_score * 0.20 +
-        delivery_score * 0.10
-    )
-    
-    # Generate feedback
-    feedback = {
-        "problem": "Strong problem framing with good statistics. Consider highlighting more specific examples of widget inefficiency." if problem_score > 80 else "Problem framing needs more specific statistics and examples to demonstrate the scale of the issue.",
-        "solution": "Clear solution presentation, but could strengthen evidence for 50% time reduction claim." if solution_score > 80 else "The solution needs to be more clearly connected to the problem with stronger evidence of effectiveness.",
-        "businessModel": "Well-defined business model with good market sizing. Include more details on customer acquisition strategy." if business_model_score > 80 else "Business model needs more detail on how you'll reach your target market and convert them to customers.",
-        "financials": "Solid financial breakdown. Consider adding more detail about how fixed costs are calculated." if financial_score > 80 else "Financial projections need more supporting details and breakdown of costs to be credible.",
-        "delivery": "Good pace and clarity. More emphasis on the conclusion could strengthen overall impact." if delivery_score > 80 else "Delivery pace needs improvement to fit within the 4-minute timeframe while maintaining clarity."
-    }
-    
-    # Return results
-    return {
-        "overall": round(overall_score, 1),
-        "sections": {
-            "problem": {
-                "score": round(problem_score, 1),
-                "feedback": feedback["problem"],
-                "strengths": ["Identifies a problem", "Includes some statistics"],
-                "improvements": ["Add more specific examples", "Quantify the impact more clearly"]
-            },
-            "solution": {
-                "score": round(solution_score, 1),
-                "feedback": feedback["solution"],
-                "strengths": ["Proposes a clear solution", "Mentions benefits"],
-                "improvements": ["Provide more evidence", "Compare with alternatives"]
-            },
-            "businessModel": {
-                "score": round(business_model_score, 1),
-                "feedback": feedback["businessModel"],
-                "strengths": ["Explains revenue mechanism", "Mentions target market"],
-                "improvements": ["Add customer acquisition strategy", "Provide more market validation"]
-            },
-            "financials": {
-                "score": round(financial_score, 1),
-                "feedback": feedback["financials"],
-                "strengths": ["Includes sales projections", "Mentions costs and margins"],
-                "improvements": ["Break down fixed costs", "Explain assumptions behind projections"]
-            },
-            "delivery": {
-                "score": round(delivery_score, 1),
-                "feedback": feedback["delivery"],
-                "strengths": ["Reasonable length", "Clear structure"],
-                "improvements": ["Strengthen conclusion", "Improve pacing"]
-            }
-        }
-    }
+        placeholder.empty()
 
-def generate_radar_chart(scores):
-    """Generate a radar chart from the evaluation scores."""
-    categories = ['Problem Framing', 'Solution', 'Business Model', 'Financials', 'Delivery']
-    values = [
-        scores['sections']['problem']['score'], 
-        scores['sections']['solution']['score'], 
-        scores['sections']['businessModel']['score'],
-        scores['sections']['financials']['score'],
-        scores['sections']['delivery']['score']
+def show_slide_grid(placeholder, futures, slide_numbers):
+    """Show the slide thumbnails rendered so far in a grid, noting how many are still rendering."""
+    shown = [
+        (number, future.result()) for number, future in zip(slide_numbers, futures)
+        if future.done() and future.result()
     ]
+    rendering = sum(1 for future in futures if not future.done())
+    with placeholder.container():
+        if shown:
+            st.image([image for _, image in shown], caption=[f"Slide {number}" for number, _ in shown], width=240)
+        if rendering:
+            st.caption(f"Rendering {rendering} more slide previews…")
+        elif not shown:
+            st.caption("Slide previews are available for PDF files, and for PowerPoint files when LibreOffice is installed.")
+
+def generate_radar_chart(scores, rubric):
+    """Generate a radar chart from the evaluation scores."""
+    categories = [section['short_label'] for section in rubric.sections]
+    values = [scores['sections'][section_id]['score'] for section_id in rubric.section_ids]
     
     # Number of variables
     N = len(categories)
@@ -526,35 +376,10 @@ def generate_radar_chart(scores):
     # Return the figure
     return fig
 
-def get_improvement_suggestions(section, score):
+def get_improvement_suggestions(section, score, rubric=None):
     """Return improvement suggestions based on section and score."""
-    suggestions = {
-        "problem": {
-            "high": "Consider adding 1-2 concise case examples of how widget inefficiency impacts specific businesses. This will strengthen your problem framing by making it more relatable and urgent.",
-            "low": "Your problem statement needs more specific data points and real-world examples. Make sure to clearly quantify the scale (e.g., '70% of users report dissatisfaction') and impact (e.g., '20 hours lost per week')."
-        },
-        "solution": {
-            "high": "Provide more concrete evidence for your time reduction claims. Consider including a brief case study or testimonial from your test users to validate your solution's effectiveness.",
-            "low": "Your solution needs to be more directly tied to the problem you identified. Make sure to clearly explain how your solution addresses each aspect of the problem and provide measurable benefits (e.g., '50% time reduction')."
-        },
-        "businessModel": {
-            "high": "Add a brief explanation of your customer acquisition strategy. How will you reach your target market efficiently? Include channels and estimated costs to strengthen the business model section.",
-            "low": "Your business model needs more detail on revenue generation mechanisms and market validation. Clearly explain how you'll make money, who your customers are, and provide data on market size (e.g., '1 million potential users')."
-        },
-        "financials": {
-            "high": "Break down your fixed costs into major categories (e.g., R&D, marketing, salaries) to demonstrate thoughtful financial planning and increase credibility of your net profit projections.",
-            "low": "Your financial overview lacks detail and realistic projections. Make sure to include gross sales projections, transaction estimates, COGS, gross margin, fixed costs, and net profit with supporting calculations."
-        },
-        "delivery": {
-            "high": "End with a stronger conclusion that reinforces your key value proposition and includes a clear call to action. What specific next step do you want the audience to take?",
-            "low": "Work on your pacing to fit within the 4-minute timeframe. Practice your delivery to improve clarity and confidence. Make sure your slides support your verbal points without overwhelming the audience."
-        }
-    }
-    
-    if score >= 80:
-        return suggestions[section]["high"]
-    else:
-        return suggestions[section]["low"]
+    rubric = rubric or load_rubric()
+    return rubric.suggestion(section, score)
 
 def create_download_link(df):
     """Generate a download link for the evaluation report as CSV."""
@@ -569,6 +394,68 @@ def main():
     st.markdown('<div class="main-header">Pitch Deck Evaluator</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">Upload, analyze, and get feedback on 4-minute business pitch presentations</div>', unsafe_allow_html=True)
     
+    # Replace the provisional result once the background evaluation has finished
+    background_evaluation = st.session_state.background_evaluation
+    if background_evaluation and background_evaluation["status"] == "done":
+        st.session_state.evaluation_results = background_evaluation["result"]
+        st.session_state.background_evaluation = None
+    
+    # Sidebar settings
+    st.sidebar.markdown("### Settings")
+    rubric_names = available_rubrics()
+    default_rubric = load_rubric()
+    rubric_name = st.sidebar.selectbox(
+        "Grading rubric",
+        options=rubric_names,
+        index=rubric_names.index(default_rubric.key) if default_rubric.key in rubric_names else 0,
+        format_func=lambda name: load_rubric(name).name,
+        help="Rubric definitions are loaded from the rubrics/ directory"
+    )
+    rubric = load_rubric(rubric_name)
+    course = st.sidebar.text_input(
+        "Course",
+        value="",
+        help="Evaluations are queued fairly per course when the API is busy"
+    )
+    student = st.sidebar.text_input(
+        "Student or team",
+        value="",
+        help="Resubmissions under the same course and name only re-evaluate the sections whose slides or speech changed"
+    )
+    
+    # Queue evaluations per course or per user (session), as configured
+    if os.environ.get("PITCH_FAIR_SHARE", "user") == "course" and course:
+        queue_key = f"course:{course}"
+    else:
+        queue_key = f"user:{st.session_state.user_id}"
+    
+    # Escalation rate of the fast-model-first evaluation cascade in this process
+    stats = cascade_stats.snapshot()
+    if stats["evaluations"]:
+        st.sidebar.markdown("### Model Cascade")
+        st.sidebar.metric(
+            "Escalated to the large model",
+            f"{stats['escalation_rate']:.0%}",
+            help=f"{stats['escalations']} of {stats['evaluations']} evaluations, {stats['mean_seconds']:.1f}s on average"
+        )
+        for reason, count in sorted(stats["reasons"].items(), key=lambda item: -item[1]):
+            st.sidebar.caption(f"{reason}: {count}")
+    reuse_evaluations = st.sidebar.checkbox(
+        "Reuse evaluations of near-identical submissions",
+        value=False,
+        help="Skip the Claude call when the slides and transcript are near-identical to a previously evaluated submission"
+    )
+    progressive = st.sidebar.checkbox(
+        "Show a provisional score while Claude evaluates",
+        value=True,
+        help="Show the local evaluation immediately and replace it with Claude's evaluation when it finishes"
+    )
+    
+    # Filled in by the results tab while a provisional result waits for Claude's,
+    # and with (futures, redraw) for slide previews that are still rendering
+    background_status = None
+    pending_previews = []
+    
     # Create tabs
     tab1, tab2, tab3 = st.tabs(["📤 Upload Materials", "📊 Evaluation Results", "📝 Grading Rubric"])
     
@@ -578,6 +465,10 @@ def main():
         
         col1, col2 = st.columns(2)
         
+        # Problems found by probing the uploads; any of these blocks evaluation
+        probe_errors = []
+        audio_duration = None
+        
         with col1:
             st.markdown('<div class="card">', unsafe_allow_html=True)
             presentation_file = st.file_uploader("Upload Presentation", type=["ppt", "pptx", "pdf", "doc", "docx"], 
@@ -586,12 +477,24 @@ def main():
             if presentation_file is not None:
                 st.success(f"✅ {presentation_file.name} uploaded successfully!")
                 
+                # Validate the file from its headers before any extraction
+                probe_report = probe_presentation(presentation_file, presentation_file.name, rubric)
+                probe_errors.extend(probe_report["errors"])
+                for error in probe_report["errors"]:
+                    st.error(error)
+                for warning in probe_report["warnings"]:
+                    st.warning(warning)
+                
                 # Show file info
                 file_details = {
                     "Filename": presentation_file.name,
                     "File size": f"{presentation_file.size / 1024:.2f} KB",
                     "File type": presentation_file.type
                 }
+                if "slides" in probe_report:
+                    file_details["Slides"] = probe_report["slides"]
+                if "pages" in probe_report:
+                    file_details["Pages"] = probe_report["pages"]
                 
                 st.json(file_details)
             st.markdown('</div>', unsafe_allow_html=True)
@@ -604,6 +507,15 @@ def main():
             if audio_file is not None:
                 st.success(f"✅ {audio_file.name} uploaded successfully!")
                 
+                # Validate the recording from its headers before any transcription
+                probe_report = probe_audio(audio_file, audio_file.name, rubric)
+                probe_errors.extend(probe_report["errors"])
+                audio_duration = probe_report.get("duration")
+                for error in probe_report["errors"]:
+                    st.error(error)
+                for warning in probe_report["warnings"]:
+                    st.warning(warning)
+                
                 # Display audio player
                 st.audio(audio_file)
                 
@@ -613,32 +525,99 @@ def main():
                     "File size": f"{audio_file.size / 1024:.2f} KB",
                     "File type": audio_file.type
                 }
+                if "duration" in probe_report:
+                    file_details["Duration"] = f"{int(probe_report['duration'] // 60)}:{int(probe_report['duration'] % 60):02d}"
+                if "sample_rate" in probe_report:
+                    file_details["Sample rate"] = f"{probe_report['sample_rate']} Hz"
                 
                 st.json(file_details)
             st.markdown('</div>', unsafe_allow_html=True)
         
         # Evaluate button
         if presentation_file and audio_file:
-            if st.button("Evaluate Pitch", type="primary", use_container_width=True):
+            if probe_errors:
+                st.info("Please fix the problems with the uploaded files before evaluating.")
+            if st.button("Evaluate Pitch", type="primary", use_container_width=True, disabled=bool(probe_errors)):
+                # A new evaluation supersedes any still running in the background
+                if st.session_state.background_evaluation:
+                    st.session_state.background_evaluation["cancelled"] = True
+                st.session_state.background_evaluation = None
                 with st.spinner("Analyzing your pitch..."):
                     # Process files
                     try:
-                        # Extract presentation text based on file type
-                        if presentation_file.name.endswith(('.doc', '.docx')):
-                            presentation_text = extract_text_from_docx(presentation_file)
-                        elif presentation_file.name.endswith('.pdf'):
-                            presentation_text = extract_text_from_pdf(presentation_file)
-                        elif presentation_file.name.endswith(('.ppt', '.pptx')):
-                            presentation_text = extract_text_from_pptx(presentation_file)
-                        else:
-                            presentation_text = ""
+                        # Keep the presentation for slide thumbnails in the results
+                        presentation_data = presentation_file.getvalue()
+                        st.session_state.presentation = {
+                            "name": presentation_file.name,
+                            "data": presentation_data,
+                            "digest": file_digest(presentation_data),
+                        }
+                        # Render the slides shown next to section feedback while the pitch is evaluated
+                        get_slide_thumbnails([section["slide"] for section in rubric.sections if section.get("slide")])
+                        
+                        # Extract the text of each slide based on file type
+                        slides = extract_presentation_slides(presentation_file, presentation_file.name)
+                        presentation_text = "\n".join(slides)
                         
                         # Extract audio transcript
                         file_extension = os.path.splitext(audio_file.name)[1]
                         transcript = extract_audio_transcript(audio_file, file_extension)
                         
-                        # Analyze content using Claude
-                        evaluation_results = analyze_presentation_with_claude(presentation_text, transcript)
+                        # Estimate when each slide was discussed
+                        timeline = align_transcript(slides, transcript, audio_duration, rubric)
+                        
+                        # Look for near-duplicates of this pitch across all previous submissions
+                        submission_index = get_submission_index()
+                        presentation_signature = compute_signature(presentation_text)
+                        transcript_signature = compute_signature(transcript)
+                        duplicates = submission_index.find_near_duplicates(presentation_signature, transcript_signature)
+                        reusable = next(
+                            (d for d in duplicates if d["reusable"] and d["evaluation"].get("rubric") == rubric.key), None
+                        ) if reuse_evaluations else None
+                        duplicate_summaries = [
+                            {key: d[key] for key in ("label", "created", "presentation_similarity", "transcript_similarity")}
+                            for d in duplicates
+                        ]
+                        submission_key = f"{course}:{student}" if student else None
+                        submission_label = presentation_file.name
+                        
+                        if reusable:
+                            # Near-identical content was already evaluated; the other team's revision history isn't ours
+                            evaluation_results = {
+                                key: value for key, value in reusable["evaluation"].items()
+                                if key not in ("revision", "provenance")
+                            }
+                            evaluation_results["reused_from"] = reusable["label"]
+                        elif progressive:
+                            # Show the deterministic local evaluation right away; Claude's replaces it when it finishes
+                            evaluation_results = analyze_presentation_fallback(presentation_text, transcript, rubric)
+                            evaluation_results.update(provisional=True, duplicates=duplicate_summaries, timeline=timeline)
+                            st.session_state.background_evaluation = start_background_evaluation(
+                                get_claude_client(), evaluation_results, slides, transcript, rubric, queue_key,
+                                submission_key=submission_key,
+                                on_done=lambda result: submission_index.add_submission(
+                                    submission_label, presentation_signature, transcript_signature, result
+                                )
+                            )
+                        elif student:
+                            # Only re-evaluate the sections whose slides or transcript changed since the last revision
+                            evaluation_results = evaluate_revision(
+                                submission_key, slides, transcript, rubric,
+                                lambda base_sections: analyze_presentation_with_claude(
+                                    presentation_text, transcript, rubric, queue_key, base_sections, timeline
+                                )
+                            )
+                        else:
+                            # Analyze content using Claude
+                            evaluation_results = analyze_presentation_with_claude(
+                                presentation_text, transcript, rubric, queue_key, timeline=timeline
+                            )
+                        
+                        if not evaluation_results.get("provisional"):
+                            # Provisional results are stored by the background evaluation when it finishes
+                            submission_index.add_submission(submission_label, presentation_signature, transcript_signature, evaluation_results)
+                        evaluation_results["duplicates"] = duplicate_summaries
+                        evaluation_results["timeline"] = timeline
                         
                         # Store results in session state
                         st.session_state.evaluation_results = evaluation_results
@@ -655,10 +634,50 @@ def main():
     with tab2:
         if st.session_state.evaluation_results:
             results = st.session_state.evaluation_results
+            results_rubric = load_rubric(results.get("rubric"))
             
             # Header with overall score
             st.markdown('<div class="section-header">Evaluation Results</div>', unsafe_allow_html=True)
             
+            # Progress of the background evaluation that will replace a provisional result
+            if results.get("provisional"):
+                background_status = st.empty()
+                if st.session_state.background_evaluation:
+                    show_background_status(background_status, st.session_state.background_evaluation)
+            elif "provisional_overall" in results:
+                if results.get("evaluation_error"):
+                    st.warning(f"Error calling Claude API: {results['evaluation_error']}. The local evaluation is final.")
+                else:
+                    change = results["overall"] - results["provisional_overall"]
+                    st.success(f"Claude's evaluation replaced the provisional score ({change:+.1f} points overall).")
+            if results.get("meta", {}).get("fallback_sections") and "provisional_overall" in results:
+                labels = ", ".join(results_rubric.section(section_id)["label"] for section_id in results["meta"]["fallback_sections"])
+                st.warning(f"Claude's response was incomplete for {labels}. Those sections use the fallback evaluation method.")
+            
+            # Flag likely copying to instructors
+            if results.get("duplicates"):
+                lines = [
+                    f"- **{d['label']}** ({datetime.fromtimestamp(d['created']).strftime('%Y-%m-%d %H:%M')}): "
+                    f"slides {d['presentation_similarity']:.0%} similar, transcript {d['transcript_similarity']:.0%} similar"
+                    for d in results["duplicates"]
+                ]
+                st.warning("⚠️ This submission is near-identical to previous submissions:\n" + "\n".join(lines))
+            if results.get("reused_from"):
+                st.info(f"Evaluation reused from the near-identical submission {results['reused_from']}.")
+            if results.get("meta"):
+                graded_by = f"Evaluated by {results['meta']['model']}"
+                if results["meta"].get("escalation_reason"):
+                    graded_by += f" (escalated: {results['meta']['escalation_reason']})"
+                st.caption(graded_by)
+            revision = results.get("revision")
+            if revision and revision["previous"]:
+                if revision["evaluated_sections"]:
+                    st.info(f"Revision {revision['number']}: re-evaluated {len(revision['evaluated_sections'])} of "
+                            f"{len(results['sections'])} sections. The others are unchanged since revision {revision['previous']}.")
+                else:
+                    st.info(f"Revision {revision['number']} is unchanged since revision {revision['previous']}, "
+                            "so its evaluation was carried over.")
+            
             col1, col2 = st.columns([1, 2])
             
             with col1:
@@ -671,52 +690,43 @@ def main():
                 ''', unsafe_allow_html=True)
                 
                 # Show rating based on score
-                if results["overall"] >= 90:
-                    rating = "Excellent"
-                    color = "#10B981"  # Green
-                elif results["overall"] >= 80:
-                    rating = "Good"
-                    color = "#3B82F6"  # Blue
-                elif results["overall"] >= 70:
-                    rating = "Satisfactory"
-                    color = "#F59E0B"  # Amber
-                else:
-                    rating = "Needs Improvement"
-                    color = "#EF4444"  # Red
+                band = results_rubric.rating(results["overall"])
                 
                 st.markdown(f'''
-                <p style="text-align:center; color:{color}; font-weight:bold;">{rating}</p>
+                <p style="text-align:center; color:{band["color"]}; font-weight:bold;">{band["label"]}</p>
                 ''', unsafe_allow_html=True)
+                if results.get("provisional"):
+                    st.markdown('<p style="text-align:center; color:#6B7280;">Provisional</p>', unsafe_allow_html=True)
+                elif "provisional_overall" in results:
+                    st.markdown(f'''
+                    <p style="text-align:center; color:#6B7280;">Provisional: {results["provisional_overall"]}%</p>
+                    ''', unsafe_allow_html=True)
                 
                 # Generate and display radar chart
-                radar_chart = generate_radar_chart(results)
+                radar_chart = generate_radar_chart(results, results_rubric)
                 st.pyplot(radar_chart)
+                plt.close(radar_chart)
                 st.markdown('</div>', unsafe_allow_html=True)
             
             with col2:
                 # Section Selection
-                sections = [
-                    {"id": "problem", "label": "Problem Framing", "weight": "25%"},
-                    {"id": "solution", "label": "Solution Framing", "weight": "25%"},
-                    {"id": "businessModel", "label": "Business Model", "weight": "20%"},
-                    {"id": "financials", "label": "Financial Overview", "weight": "20%"},
-                    {"id": "delivery", "label": "Delivery & Impact", "weight": "10%"}
-                ]
+                sections = results_rubric.sections
+                section_ids = results_rubric.section_ids
                 
                 st.markdown('<div class="card">', unsafe_allow_html=True)
                 selected_section = st.selectbox(
                     "View detailed feedback by section:",
-                    options=[section["id"] for section in sections],
-                    format_func=lambda x: next((s["label"] for s in sections if s["id"] == x), x),
-                    index=[section["id"] for section in sections].index(st.session_state.current_section)
+                    options=section_ids,
+                    format_func=lambda x: results_rubric.section(x)["label"],
+                    index=section_ids.index(st.session_state.current_section) if st.session_state.current_section in section_ids else 0
                 )
                 
                 st.session_state.current_section = selected_section
                 
                 # Display section score
                 section_score = results["sections"][selected_section]["score"]
-                section_label = next((s["label"] for s in sections if s["id"] == selected_section), selected_section)
-                section_weight = next((s["weight"] for s in sections if s["id"] == selected_section), "")
+                section_label = results_rubric.section(selected_section)["label"]
+                section_weight = results_rubric.section(selected_section)["weight_label"]
                 
                 col_a, col_b = st.columns([3, 1])
                 
@@ -724,20 +734,34 @@ def main():
                     st.markdown(f"### {section_label} <span style='color:#6B7280; font-weight:normal; font-size:1rem;'>({section_weight})</span>", unsafe_allow_html=True)
                 
                 with col_b:
-                    if section_score >= 90:
-                        score_color = "#10B981"  # Green
-                    elif section_score >= 80:
-                        score_color = "#3B82F6"  # Blue
-                    elif section_score >= 70:
-                        score_color = "#F59E0B"  # Amber
-                    else:
-                        score_color = "#EF4444"  # Red
+                    score_color = results_rubric.rating(section_score)["color"]
                     
                     st.markdown(f"<h2 style='color:{score_color}; text-align:right;'>{section_score}%</h2>", unsafe_allow_html=True)
+                    provisional_score = results.get("provisional_sections", {}).get(selected_section)
+                    if provisional_score is not None:
+                        st.markdown(f"<p style='color:#6B7280; text-align:right;'>{section_score - provisional_score:+.1f} vs provisional</p>", unsafe_allow_html=True)
                 
-                # Display feedback
-                st.markdown("#### Feedback")
-                st.markdown(f'''<div class="feedback-box">{results["sections"][selected_section]["feedback"]}</div>''', unsafe_allow_html=True)
+                provenance = results.get("provenance", {}).get(selected_section)
+                if provenance and provenance["source"] == "reused":
+                    evaluated_at = datetime.fromtimestamp(provenance["evaluated_at"]).strftime('%Y-%m-%d %H:%M')
+                    st.caption(f"Unchanged since revision {provenance['revision']}; feedback carried over from {evaluated_at}.")
+                
+                # Display feedback, next to the slide it refers to when there is one.
+                # A slide still rendering gets a placeholder rather than holding up the page
+                slide_number = results_rubric.section(selected_section).get("slide")
+                thumbnail = get_slide_thumbnails([slide_number])[0] if slide_number else None
+                if thumbnail is not None and (not thumbnail.done() or thumbnail.result()):
+                    feedback_col, slide_col = st.columns([2, 1])
+                    with slide_col:
+                        redraw = partial(show_slide_preview, st.empty(), thumbnail, slide_number)
+                    redraw()
+                    if not thumbnail.done():
+                        pending_previews.append(([thumbnail], redraw))
+                else:
+                    feedback_col = st.container()
+                with feedback_col:
+                    st.markdown("#### Feedback")
+                    st.markdown(f'''<div class="feedback-box">{results["sections"][selected_section]["feedback"]}</div>''', unsafe_allow_html=True)
                 
                 # Display strengths and improvements (from Claude analysis)
                 col1, col2 = st.columns(2)
@@ -766,24 +790,54 @@ def main():
                             st.markdown("No specific improvements suggested.")
                     else:
                         # Fallback for older analysis format
-                        improvement_suggestion = get_improvement_suggestions(selected_section, section_score)
+                        improvement_suggestion = get_improvement_suggestions(selected_section, section_score, results_rubric)
                         st.markdown(f'''<div class="improvement-box">{improvement_suggestion}</div>''', unsafe_allow_html=True)
                 
                 st.markdown('</div>', unsafe_allow_html=True)
             
+            # Per-slide speaking time from the transcript alignment
+            timeline = results.get("timeline")
+            if timeline:
+                st.markdown('<div class="section-header">Slide Timing</div>', unsafe_allow_html=True)
+                timing_df = pd.DataFrame({
+                    "Slide": [f"Slide {s['slide']}" for s in timeline["slides"]],
+                    "Section": [results_rubric.section(s["section"])["label"] if s["section"] else "" for s in timeline["slides"]],
+                    "Start": [f"{int(s['start'] // 60)}:{int(s['start'] % 60):02d}" if s["start"] is not None else "" for s in timeline["slides"]],
+                    "Seconds": [s["seconds"] for s in timeline["slides"]],
+                    "Words": [s["words"] for s in timeline["slides"]],
+                })
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    st.dataframe(timing_df, hide_index=True, use_container_width=True)
+                with col2:
+                    st.bar_chart(timing_df.set_index("Slide")["Seconds"])
+                st.caption(
+                    f"Estimated by aligning the transcript with the slides and spreading the recording over them by word count; "
+                    f"about {timeline['target_seconds']:.0f} seconds per slide fits the time limit."
+                )
+                
+                # Only render the whole deck when asked, so large decks don't slow down the page
+                if st.session_state.presentation and st.checkbox("Show all slides"):
+                    slide_numbers = [s["slide"] for s in timeline["slides"]]
+                    thumbnails = get_slide_thumbnails(slide_numbers)
+                    redraw = partial(show_slide_grid, st.empty(), thumbnails, slide_numbers)
+                    redraw()
+                    if not all(future.done() for future in thumbnails):
+                        pending_previews.append((thumbnails, redraw))
+            
             # Generate downloadable report
             st.markdown('<div class="section-header">Download Report</div>', unsafe_allow_html=True)
             
             # Create report dataframe
             report_data = {
                 "Section": [s["label"] for s in sections],
-                "Weight": [s["weight"] for s in sections],
+                "Weight": [s["weight_label"] for s in sections],
                 "Score": [results["sections"][s["id"]]["score"] for s in sections],
                 "Feedback": [results["sections"][s["id"]]["feedback"] for s in sections]
             }
             
             # Add strengths and improvements if available
-            if "strengths" in results["sections"]["problem"]:
+            if "strengths" in results["sections"][section_ids[0]]:
                 report_data["Strengths"] = [
                     ", ".join(results["sections"][s["id"]].get("strengths", [])) 
                     for s in sections
@@ -797,17 +851,13 @@ def main():
             
             if "Strengths" not in report_df.columns:
                 report_df["Improvement"] = [
-                    get_improvement_suggestions(s["id"], results["sections"][s["id"]]["score"]) 
+                    get_improvement_suggestions(s["id"], results["sections"][s["id"]]["score"], results_rubric)
                     for s in sections
                 ]
                 
-            report_df["Weighted Score"] = [
-                results["sections"]["problem"]["score"] * 0.25,
-                results["sections"]["solution"]["score"] * 0.25,
-                results["sections"]["businessModel"]["score"] * 0.20,
-                results["sections"]["financials"]["score"] * 0.20,
-                results["sections"]["delivery"]["score"] * 0.10
-            ]
+            report_df["Weighted Score"] = results_rubric.weighted_scores(
+                {section_id: results["sections"][section_id]["score"] for section_id in section_ids}
+            )
             
             # Add overall score row
             overall_row = pd.DataFrame({
@@ -836,105 +886,11 @@ def main():
     with tab3:
         st.markdown('<div class="section-header">Pitch Evaluation Rubric</div>', unsafe_allow_html=True)
         
-        # Problem Framing
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('''
-        <h3 class="text-lg font-semibold mb-3">Problem Framing (25%)</h3>
-        <div class="rubric-card">
-            <p><span class="rubric-level">Excellent (90-100%):</span> Clearly identifies a significant problem with compelling statistics and examples</p>
-            <p><span class="rubric-level">Good (80-89%):</span> Problem is well-defined with supporting data but may lack some specificity</p>
-            <p><span class="rubric-level">Satisfactory (70-79%):</span> Problem is identified but lacks sufficient supporting evidence</p>
-            <p><span class="rubric-level">Needs Improvement (Below 70%):</span> Problem is vague or poorly supported</p>
-            
-            <div class="rubric-highlight">
-                <p><strong>Key elements:</strong> Definition of problem, statistics showing scale (70% user dissatisfaction), impact demonstration (20 hours lost per week), audience relevance</p>
-            </div>
-        </div>
-        ''', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Solution Framing
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('''
-        <h3 class="text-lg font-semibold mb-3">Solution Framing (25%)</h3>
-        <div class="rubric-card">
-            <p><span class="rubric-level">Excellent (90-100%):</span> Solution directly addresses problem with strong evidence of effectiveness</p>
-            <p><span class="rubric-level">Good (80-89%):</span> Clear solution with some evidence of effectiveness</p>
-            <p><span class="rubric-level">Satisfactory (70-79%):</span> Solution is presented but connection to problem or evidence is weak</p>
-            <p><span class="rubric-level">Needs Improvement (Below 70%):</span> Solution is vague or ineffectively connected to problem</p>
-            
-            <div class="rubric-highlight">
-                <p><strong>Key elements:</strong> Clear description of solution, evidence of effectiveness (50% time reduction, 95% satisfaction), demonstration of impact, comparison with alternatives</p>
-            </div>
-        </div>
-        ''', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Business Model
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('''
-        <h3 class="text-lg font-semibold mb-3">Business Model (20%)</h3>
-        <div class="rubric-card">
-            <p><span class="rubric-level">Excellent (90-100%):</span> Clear, viable business model with strong market validation</p>
-            <p><span class="rubric-level">Good (80-89%):</span> Well-defined business model with some market validation</p>
-            <p><span class="rubric-level">Satisfactory (70-79%):</span> Basic business model presented but lacks detail or validation</p>
-            <p><span class="rubric-level">Needs Improvement (Below 70%):</span> Business model is unclear or unrealistic</p>
-            
-            <div class="rubric-highlight">
-                <p><strong>Key elements:</strong> Revenue mechanism, customer acquisition strategy, market size (1 million potential users), value proposition alignment</p>
-            </div>
-        </div>
-        ''', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Financial Overview
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('''
-        <h3 class="text-lg font-semibold mb-3">Financial Overview (20%)</h3>
-        <div class="rubric-card">
-            <p><span class="rubric-level">Excellent (90-100%):</span> Comprehensive financial projections with realistic assumptions</p>
-            <p><span class="rubric-level">Good (80-89%):</span> Solid financial breakdown with mostly realistic projections</p>
-            <p><span class="rubric-level">Satisfactory (70-79%):</span> Basic financial information provided but lacks detail or realism</p>
-            <p><span class="rubric-level">Needs Improvement (Below 70%):</span> Financial information is missing key elements or unrealistic</p>
-            
-            <div class="rubric-highlight">
-                <p><strong>Key elements:</strong> Gross sales projections ($5M), transaction estimates (500,000), COGS ($2M), gross margin ($3M), fixed costs ($1M), net profit ($2M)</p>
-            </div>
-        </div>
-        ''', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Delivery & Impact
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('''
-        <h3 class="text-lg font-semibold mb-3">Delivery & Impact (10%)</h3>
-        <div class="rubric-card">
-            <p><span class="rubric-level">Excellent (90-100%):</span> Confident, engaging delivery that stays within 4-minute time limit</p>
-            <p><span class="rubric-level">Good (80-89%):</span> Clear delivery with good time management</p>
-            <p><span class="rubric-level">Satisfactory (70-79%):</span> Adequate delivery with some timing issues</p>
-            <p><span class="rubric-level">Needs Improvement (Below 70%):</span> Poor delivery or significantly over/under time</p>
-            
-            <div class="rubric-highlight">
-                <p><strong>Key elements:</strong> Time management (4-minute limit), slide quality, verbal clarity, engagement, compelling conclusion</p>
-            </div>
-        </div>
-        ''', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Assignment Guidelines
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('''
-        <h3 class="text-lg font-semibold mb-3">Assignment Guidelines</h3>
-        <p>Students should prepare a 4-minute business pitch with exactly 4 slides:</p>
-        <ol>
-            <li><strong>Slide 1: Problem Framing</strong> - Identify the problem, show statistics, explain who is affected</li>
-            <li><strong>Slide 2: Solution Framing</strong> - Present your solution, explain how it works, provide evidence</li>
-            <li><strong>Slide 3: Business Model</strong> - Explain how you make money, show market demand, identify target customers</li>
-            <li><strong>Slide 4: Financial Overview</strong> - Detail gross sales, transactions, costs, margins, and profit</li>
-        </ol>
-        <p>Remember to stay within the 4-minute time limit and follow the structure outlined in the assignment.</p>
-        ''', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        # Pre-rendered cards for each section, followed by the assignment guidelines
+        for card_html in rubric.html_cards:
+            st.markdown('<div class="card">', unsafe_allow_html=True)
+            st.markdown(card_html, unsafe_allow_html=True)
+            st.markdown('</div>', unsafe_allow_html=True)
         
     # Footer
     st.markdown('''
@@ -942,6 +898,22 @@ def main():
         Pitch Deck Evaluator • Created for Business Pitch Assessment
     </div>
     ''', unsafe_allow_html=True)
+    
+    # Poll what is still running by updating only its placeholders: slide previews as they finish
+    # rendering and the background evaluation's status. Charts, probes and thumbnails are drawn
+    # again once, when the evaluation result is picked up at the top of the next run.
+    # Any interaction with the page still stops this loop and reruns the script as usual.
+    background_evaluation = st.session_state.background_evaluation
+    while pending_previews or (background_evaluation and background_evaluation["status"] != "done"):
+        time.sleep(0.5)
+        for futures, redraw in list(pending_previews):
+            redraw()
+            if all(future.done() for future in futures):
+                pending_previews.remove((futures, redraw))
+        if background_evaluation and background_status is not None:
+            show_background_status(background_status, background_evaluation)
+    if background_evaluation:
+        st.experimental_rerun()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,221 @@
+# dedup.py
+"""
+Near-duplicate detection across all submitted pitches.
+
+Each presentation and transcript is reduced to a MinHash signature over word
+shingles. Signatures are stored in a SQLite history together with the
+evaluation they received, and banded into an LSH index so that candidate
+near-duplicates are found with a handful of indexed lookups rather than a scan
+of the whole history.
+
+Submissions are flagged on slide similarity; the transcript only decides
+whether a stored evaluation can be reused, since a script every team reads (or
+a transcriber that returns fixed text) makes transcripts alike without any
+copying. A deck that is exactly the same as in many earlier submissions, such
+as an unmodified course template, is not flagged either.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+from functools import lru_cache
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+# Estimated Jaccard similarity above which a submission is flagged to instructors
+DUPLICATE_THRESHOLD = 0.8
+# ... and above which its stored evaluation may be reused as-is
+REUSE_THRESHOLD = 0.95
+# A deck shared exactly by more earlier submissions than this is a template, not a copy
+COMMON_SIGNAL_LIMIT = 3
+# Most matches returned for one submission
+MAX_MATCHES = 5
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".pitch_evaluator", "history.db")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed so signatures stay comparable across processes and restarts
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"[a-z0-9$%]+")
+
+
+def _shingle_hashes(text):
+    """Hash the word shingles of a text to unique 32-bit values."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.unique(np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)))
+
+
+def compute_signature(text):
+    """Compute the MinHash signature of a text."""
+    hashes = _shingle_hashes(text)
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    # Universal hashing (a * x + b) mod p, one row per permutation; uint64 overflow wraps as intended
+    with np.errstate(over='ignore'):
+        permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=0)
+
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimate the Jaccard similarity of two texts from their signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+
+def _band_buckets(signature):
+    """Hash each band of a signature to a 64-bit bucket key."""
+    buckets = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        bucket = int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "big", signed=True)
+        buckets.append((band, bucket))
+    return buckets
+
+
+def _signature_digest(signature):
+    """Short digest of a whole signature, for finding exact repeats with an indexed lookup."""
+    return hashlib.blake2b(signature.tobytes(), digest_size=16).hexdigest()
+
+
+def is_reusable_evaluation(evaluation):
+    """Only complete Claude evaluations are reused; local fallback scores never are."""
+    return bool(evaluation) and "meta" in evaluation and not evaluation["meta"].get("fallback_sections")
+
+
+class SubmissionIndex:
+    """LSH index over the MinHash signatures of every evaluated submission."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("PITCH_HISTORY_DB", DEFAULT_HISTORY_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS submissions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    presentation_signature BLOB NOT NULL,
+                    transcript_signature BLOB NOT NULL,
+                    evaluation TEXT
+                );
+                CREATE TABLE IF NOT EXISTS lsh_buckets (
+                    kind TEXT NOT NULL,
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    submission_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS lsh_lookup ON lsh_buckets (kind, band, bucket);
+            """)
+            # Histories created before the signature digests were stored
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(submissions)")}
+            if "presentation_digest" not in columns:
+                conn.execute("ALTER TABLE submissions ADD COLUMN presentation_digest TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS presentation_digest_lookup ON submissions (presentation_digest)")
+
+    def _connect(self):
+        # A short-lived connection per operation keeps the index safe to share across Streamlit sessions
+        return sqlite3.connect(self.path, timeout=30)
+
+    def add_submission(self, label, presentation_signature, transcript_signature, evaluation=None):
+        """Store a submission and index its signatures. Returns the submission id."""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO submissions (label, created, presentation_signature, transcript_signature, evaluation, "
+                "presentation_digest) VALUES (?, ?, ?, ?, ?, ?)",
+                (label, time.time(), presentation_signature.tobytes(), transcript_signature.tobytes(),
+                 json.dumps(evaluation) if evaluation is not None else None,
+                 _signature_digest(presentation_signature))
+            )
+            submission_id = cursor.lastrowid
+            rows = []
+            for kind, signature in (("presentation", presentation_signature), ("transcript", transcript_signature)):
+                rows.extend((kind, band, bucket, submission_id) for band, bucket in _band_buckets(signature))
+            conn.executemany("INSERT INTO lsh_buckets (kind, band, bucket, submission_id) VALUES (?, ?, ?, ?)", rows)
+        return submission_id
+
+    def _candidates(self, conn, kind, signature):
+        buckets = _band_buckets(signature)
+        placeholders = ", ".join("(?, ?)" for _ in buckets)
+        params = [kind] + [value for pair in buckets for value in pair]
+        rows = conn.execute(
+            f"SELECT DISTINCT submission_id FROM lsh_buckets WHERE kind = ? AND (band, bucket) IN (VALUES {placeholders})",
+            params
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def _is_common(self, conn, signature):
+        """Whether this exact deck was already submitted more than COMMON_SIGNAL_LIMIT times."""
+        # Stops counting at the limit, so a template shared by the whole history stays cheap
+        count = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM submissions WHERE presentation_digest = ? LIMIT ?)",
+            (_signature_digest(signature), COMMON_SIGNAL_LIMIT + 1)
+        ).fetchone()[0]
+        return count > COMMON_SIGNAL_LIMIT
+
+    def find_near_duplicates(self, presentation_signature, transcript_signature, threshold=DUPLICATE_THRESHOLD,
+                             limit=MAX_MATCHES):
+        """
+        Find previous submissions whose slides are near-identical to these.
+        Returns at most limit matches, most similar first.
+        """
+        empty = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+        with closing(self._connect()) as conn:
+            # Empty decks all share the same signature and, like templates, say nothing about copying
+            if np.array_equal(presentation_signature, empty) or self._is_common(conn, presentation_signature):
+                return []
+            candidates = self._candidates(conn, "presentation", presentation_signature)
+            if not candidates:
+                return []
+            placeholders = ", ".join("?" for _ in candidates)
+            rows = conn.execute(
+                "SELECT id, label, created, presentation_signature, transcript_signature, evaluation "
+                f"FROM submissions WHERE id IN ({placeholders})",
+                list(candidates)
+            ).fetchall()
+
+        matches = []
+        for submission_id, label, created, stored_presentation, stored_transcript, evaluation in rows:
+            presentation_similarity = estimate_similarity(presentation_signature, np.frombuffer(stored_presentation, dtype=np.uint64))
+            transcript_similarity = estimate_similarity(transcript_signature, np.frombuffer(stored_transcript, dtype=np.uint64))
+            if presentation_similarity < threshold:
+                continue
+            evaluation = json.loads(evaluation) if evaluation else None
+            matches.append({
+                "id": submission_id,
+                "label": label,
+                "created": created,
+                "presentation_similarity": round(presentation_similarity, 3),
+                "transcript_similarity": round(transcript_similarity, 3),
+                "reusable": (
+                    is_reusable_evaluation(evaluation)
+                    and min(presentation_similarity, transcript_similarity) >= REUSE_THRESHOLD
+                ),
+                "evaluation": evaluation,
+            })
+        matches.sort(key=lambda m: (m["presentation_similarity"], m["transcript_similarity"]), reverse=True)
+        return matches[:limit]
+
+
+@lru_cache(maxsize=None)
+def get_submission_index(path=None):
+    """Return the process-wide submission index."""
+    return SubmissionIndex(path)
@@ -0,0 +1,367 @@
+# evaluator.py
+"""
+Structured Claude evaluation of a pitch against a compiled rubric.
+
+The response schema is enforced with a forced tool call and every section is
+validated against a typed model. Sections that are missing or invalid (for
+example because the output was truncated) are re-requested on their own with
+a small follow-up call instead of discarding the whole evaluation.
+
+Evaluations run as a cascade: a fast model scores the pitch first and the
+large model is only called when the result is close to a grade boundary, the
+sections disagree, or the fast output fails validation.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+
+import anthropic
+
+EVALUATION_MODEL = "claude-3-opus-20240229"
+FAST_MODEL = "claude-3-haiku-20240307"
+MAX_TOKENS = 4000
+REPAIR_MAX_TOKENS = 1500
+TEMPERATURE = 0.1  # Low temperature for more consistent output
+
+TOOL_NAME = "record_evaluation"
+
+SECTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "number", "minimum": 0, "maximum": 100, "description": "Score for this section (0-100)"},
+        "feedback": {"type": "string", "description": "Specific feedback for this section"},
+        "strengths": {"type": "array", "items": {"type": "string"}, "description": "Areas of strength"},
+        "improvements": {"type": "array", "items": {"type": "string"}, "description": "Suggestions for improvement"},
+    },
+    "required": ["score", "feedback", "strengths", "improvements"],
+}
+
+
+class EvaluationError(Exception):
+    """Raised when Claude's evaluation cannot be completed or repaired."""
+
+
+@dataclass
+class SectionEvaluation:
+    """Typed model of one rubric section in an evaluation."""
+    score: float
+    feedback: str
+    strengths: list = field(default_factory=list)
+    improvements: list = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Validate raw section data, coercing near-misses ("85%", a single string for a list).
+        Raises ValueError listing every problem found.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("section is not an object")
+        problems = []
+
+        score = data.get("score")
+        if isinstance(score, str):
+            score = score.strip().rstrip("%").strip()
+        try:
+            score = float(score)
+            if not 0 <= score <= 100:
+                problems.append(f"score {score:g} is outside 0-100")
+        except (TypeError, ValueError):
+            problems.append("score is missing or not a number")
+
+        feedback = data.get("feedback")
+        if not isinstance(feedback, str) or not feedback.strip():
+            problems.append("feedback is missing")
+
+        lists = {}
+        for name in ("strengths", "improvements"):
+            value = data.get(name)
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                problems.append(f"{name} is missing or not a list of strings")
+            lists[name] = value
+
+        if problems:
+            raise ValueError("; ".join(problems))
+        return cls(round(score, 1), feedback.strip(), lists["strengths"], lists["improvements"])
+
+
+def evaluation_tool(rubric, section_ids=None):
+    """Tool definition whose input schema is the evaluation format for the given sections."""
+    section_ids = section_ids or rubric.section_ids
+    return {
+        "name": TOOL_NAME,
+        "description": "Record the evaluation of the pitch against the rubric.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "overall": {"type": "number", "description": "Overall score, weighted according to the percentages"},
+                "sections": {
+                    "type": "object",
+                    "properties": {section_id: SECTION_SCHEMA for section_id in section_ids},
+                    "required": list(section_ids),
+                },
+            },
+            "required": ["sections"],
+        },
+    }
+
+
+def _salvage_sections(text, section_ids):
+    """Recover every complete section object from malformed or truncated JSON text."""
+    decoder = json.JSONDecoder()
+    sections = {}
+    for section_id in section_ids:
+        match = re.search(r'"' + re.escape(section_id) + r'"\s*:\s*{', text)
+        if not match:
+            continue
+        try:
+            sections[section_id], _ = decoder.raw_decode(text, match.end() - 1)
+        except json.JSONDecodeError:
+            continue
+    return {"sections": sections}
+
+
+def parse_response(response, section_ids):
+    """Extract the evaluation dict from a tool call, or from JSON text as a fallback."""
+    for block in response.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == TOOL_NAME:
+            if isinstance(block.input, dict):
+                return block.input
+
+    text = "".join(getattr(block, "text", "") for block in response.content)
+    # Find the JSON object in the response (in case Claude adds additional text)
+    json_match = re.search(r'({[\s\S]*})', text)
+    if json_match:
+        try:
+            return json.loads(json_match.group(1))
+        except json.JSONDecodeError:
+            pass
+    return _salvage_sections(text, section_ids)
+
+
+def validate_evaluation(raw, section_ids):
+    """
+    Validate the sections of a raw evaluation.
+    Returns ({section_id: SectionEvaluation}, {section_id: problem}) for valid and invalid sections.
+    """
+    sections = raw.get("sections") if isinstance(raw, dict) else None
+    if not isinstance(sections, dict):
+        sections = {}
+    valid = {}
+    invalid = {}
+    for section_id in section_ids:
+        if section_id not in sections:
+            invalid[section_id] = "section is missing"
+            continue
+        try:
+            valid[section_id] = SectionEvaluation.from_dict(sections[section_id])
+        except ValueError as e:
+            invalid[section_id] = str(e)
+    return valid, invalid
+
+
+def request_sections(client, rubric, prompt, section_ids, model=EVALUATION_MODEL, max_tokens=MAX_TOKENS):
+    """Ask Claude for the given sections through a forced tool call and validate the answer."""
+    response = client.messages.create(
+        model=model,
+        max_tokens=max_tokens,
+        temperature=TEMPERATURE,
+        system=rubric.system_prompt,
+        tools=[evaluation_tool(rubric, section_ids)],
+        tool_choice={"type": "tool", "name": TOOL_NAME},
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+    return validate_evaluation(parse_response(response, section_ids), section_ids)
+
+
+def repair_prompt(prompt, invalid):
+    """Follow-up prompt asking only for the sections that were missing or invalid."""
+    problems = "\n".join(f"- {section_id}: {problem}" for section_id, problem in invalid.items())
+    return (
+        f"{prompt}\n\n"
+        "A previous evaluation of this pitch was incomplete. Provide the evaluation for ONLY the following "
+        f"sections, each with a numeric score from 0 to 100, feedback, strengths and improvements:\n{problems}"
+    )
+
+
+def partial_prompt(prompt, rubric, section_ids):
+    """Prompt asking only for some sections, when the others are carried over from an earlier evaluation."""
+    labels = ", ".join(f"{rubric.section(section_id)['label']} ({section_id})" for section_id in section_ids)
+    return (
+        f"{prompt}\n\n"
+        f"The other sections were already evaluated and have not changed. Evaluate ONLY these sections: {labels}."
+    )
+
+
+def evaluate_pitch(client, rubric, prompt, model=EVALUATION_MODEL, fallback_sections=None, repair=True, base_sections=None):
+    """
+    Evaluate a pitch with Claude, repairing missing or invalid sections with one follow-up call.
+
+    fallback_sections, if given, is a callable returning local section results; it is only used
+    for sections that are still invalid after the repair. Otherwise EvaluationError is raised.
+    base_sections, if given, are section results carried over unchanged; only the remaining
+    sections are requested from Claude.
+    Returns the evaluation in the {"overall", "sections"} schema with a "meta" record of what was repaired.
+    """
+    base_sections = base_sections or {}
+    section_ids = [section_id for section_id in rubric.section_ids if section_id not in base_sections]
+    if base_sections:
+        prompt = partial_prompt(prompt, rubric, section_ids)
+    valid, invalid = request_sections(client, rubric, prompt, section_ids, model=model)
+
+    repaired = []
+    if invalid and repair:
+        repaired_valid, invalid = request_sections(
+            client, rubric, repair_prompt(prompt, invalid), list(invalid), model=model, max_tokens=REPAIR_MAX_TOKENS
+        )
+        valid.update(repaired_valid)
+        repaired = list(repaired_valid)
+
+    sections = dict(base_sections)
+    sections.update((section_id, asdict(section)) for section_id, section in valid.items())
+    if invalid:
+        if fallback_sections is None:
+            raise EvaluationError("Invalid sections after repair: " + ", ".join(invalid))
+        local = fallback_sections()
+        for section_id in invalid:
+            sections[section_id] = local[section_id]
+
+    # The overall score is the rubric's weighted sum, whatever Claude computed
+    overall = rubric.overall_score({section_id: sections[section_id]["score"] for section_id in rubric.section_ids})
+
+    return {
+        "overall": round(overall, 1),
+        "sections": {section_id: sections[section_id] for section_id in rubric.section_ids},
+        "rubric": rubric.key,
+        "meta": {
+            "model": model,
+            "evaluated_sections": section_ids,
+            "repaired_sections": repaired,
+            "fallback_sections": list(invalid),
+        },
+    }
+
+
+@dataclass
+class CascadePolicy:
+    """When a fast first-pass evaluation is escalated to the large model."""
+    enabled: bool = True
+    fast_model: str = FAST_MODEL
+    strong_model: str = EVALUATION_MODEL
+    # Escalate when the overall score is within this many points of a rating band boundary
+    boundary_margin: float = 3.0
+    # Escalate when a section scores further than this from its locally verified score.
+    # Uneven section scores on their own are not a signal: many pitches are strong in one
+    # area and weak in another. A fast-model score that contradicts the deterministic check
+    # of the same section (e.g. the verified financial figures) is.
+    reference_margin: float = 25.0
+
+    @classmethod
+    def from_env(cls):
+        """Build the policy from PITCH_CASCADE_* environment variables, falling back to the defaults."""
+        defaults = cls()
+        return cls(
+            enabled=os.environ.get("PITCH_CASCADE", "on").lower() not in ("0", "off", "false", "no"),
+            fast_model=os.environ.get("PITCH_CASCADE_FAST_MODEL", defaults.fast_model),
+            strong_model=os.environ.get("PITCH_CASCADE_STRONG_MODEL", defaults.strong_model),
+            boundary_margin=float(os.environ.get("PITCH_CASCADE_BOUNDARY_MARGIN", defaults.boundary_margin)),
+            reference_margin=float(os.environ.get("PITCH_CASCADE_REFERENCE_MARGIN", defaults.reference_margin)),
+        )
+
+    def escalation_reason(self, result, rubric, reference_scores=None):
+        """
+        Why a first-pass result needs the large model, or None if it can stand.
+        reference_scores maps section ids to scores computed locally from verified facts.
+        """
+        overall = result["overall"]
+        for band in rubric.bands:
+            if band["min"] > 0 and abs(overall - band["min"]) < self.boundary_margin:
+                return f"near the {band['min']} grade boundary"
+
+        evaluated = result.get("meta", {}).get("evaluated_sections", result["sections"])
+        for section_id, reference in (reference_scores or {}).items():
+            if section_id not in evaluated or section_id not in result["sections"]:
+                continue
+            score = result["sections"][section_id]["score"]
+            if abs(score - reference) > self.reference_margin:
+                return f"disagrees with the local check ({section_id}: {score:.0f} vs {reference:.0f})"
+        return None
+
+
+class CascadeStats:
+    """Process-wide counters of how many evaluations were escalated, and why."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.evaluations = 0
+        self.escalations = 0
+        self.reasons = Counter()
+        self.seconds = Counter()
+
+    def record(self, reason, seconds):
+        with self._lock:
+            self.evaluations += 1
+            self.seconds["total"] += seconds
+            if reason:
+                self.escalations += 1
+                self.reasons[reason.split(" (")[0]] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "evaluations": self.evaluations,
+                "escalations": self.escalations,
+                "escalation_rate": self.escalations / self.evaluations if self.evaluations else 0.0,
+                "reasons": dict(self.reasons),
+                "mean_seconds": self.seconds["total"] / self.evaluations if self.evaluations else 0.0,
+            }
+
+
+cascade_stats = CascadeStats()
+
+
+def evaluate_with_cascade(client, rubric, prompt, policy=None, fallback_sections=None, base_sections=None,
+                          reference_scores=None):
+    """
+    Evaluate with the fast model first and escalate to the large model only when the policy says so.
+    The result's "meta" records the model that produced it and, if escalated, why.
+    base_sections are carried over as in evaluate_pitch and count towards the escalation checks;
+    reference_scores are locally computed section scores the first pass is checked against.
+    """
+    policy = policy or CascadePolicy.from_env()
+    if not policy.enabled:
+        return evaluate_pitch(client, rubric, prompt, model=policy.strong_model,
+                              fallback_sections=fallback_sections, base_sections=base_sections)
+
+    started = time.time()
+    try:
+        # No repair on the first pass: invalid output is itself a reason to escalate
+        first_pass = evaluate_pitch(client, rubric, prompt, model=policy.fast_model, repair=False, base_sections=base_sections)
+        reason = policy.escalation_reason(first_pass, rubric, reference_scores)
+    except EvaluationError as e:
+        first_pass = None
+        reason = f"first pass failed validation ({e})"
+    except anthropic.APIError as e:
+        # An overloaded or failing fast model shouldn't fail the evaluation while the large one is available
+        first_pass = None
+        reason = f"fast model call failed ({e})"
+
+    if reason is None:
+        result = first_pass
+    else:
+        result = evaluate_pitch(client, rubric, prompt, model=policy.strong_model,
+                                fallback_sections=fallback_sections, base_sections=base_sections)
+        result["meta"]["escalation_reason"] = reason
+        if first_pass is not None:
+            result["meta"]["first_pass"] = {"model": policy.fast_model, "overall": first_pass["overall"]}
+
+    cascade_stats.record(reason, time.time() - started)
+    return result
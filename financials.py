@@ -0,0 +1,344 @@
+# financials.py
+"""
+Deterministic extraction and validation of the figures behind the
+Financial Overview criterion.
+
+Monetary amounts, percentages and counts are pulled out of the slide text and
+the transcript with precompiled patterns, assigned to the six financial line
+items (gross sales, transactions, COGS, gross margin, fixed costs, net profit)
+and checked locally:
+
+    gross margin = gross sales - COGS
+    net profit   = gross margin - fixed costs
+"""
+import re
+
+FIELDS = ["gross_sales", "transactions", "cogs", "gross_margin", "fixed_costs", "net_profit"]
+
+FIELD_LABELS = {
+    "gross_sales": "Gross sales",
+    "transactions": "Transactions",
+    "cogs": "COGS",
+    "gross_margin": "Gross margin",
+    "fixed_costs": "Fixed costs",
+    "net_profit": "Net profit",
+}
+
+_SCALES = {
+    "k": 1e3, "thousand": 1e3,
+    "m": 1e6, "mm": 1e6, "mn": 1e6, "million": 1e6,
+    "b": 1e9, "bn": 1e9, "billion": 1e9,
+}
+
+_NUMBER = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?'
+_SCALE = r'thousand|million|billion|mm|mn|bn|[kmb]'
+
+# "$5 million", "$5M", "$1,200,000", "-$300k"
+MONEY_RE = re.compile(
+    r'(?P<neg>-\s?)?\$\s?(?P<num>' + _NUMBER + r')\s?(?P<scale>' + _SCALE + r')?\b',
+    re.IGNORECASE
+)
+# "5 million dollars", "300,000 USD"
+MONEY_WORDS_RE = re.compile(
+    r'(?<![\$\d.,])(?P<num>' + _NUMBER + r')\s?(?P<scale>' + _SCALE + r')?\s+(?:dollars|usd)\b',
+    re.IGNORECASE
+)
+PERCENT_RE = re.compile(r'(?P<num>\d+(?:\.\d+)?)\s?(?:%|percent\b)', re.IGNORECASE)
+COUNT_RE = re.compile(
+    r'(?<![\$\d.,])(?P<num>' + _NUMBER + r')\s?(?P<scale>thousand|million|billion)?\s+'
+    r'(?:\w+\s+)?(?P<unit>transactions?|orders?|units|sales|customers|users|subscribers|downloads)\b',
+    re.IGNORECASE
+)
+# "Transactions: 500,000" as it typically appears on a slide
+TRANSACTIONS_LABEL_RE = re.compile(
+    r'\b(?:transactions?|orders?|units sold)\s*[:\-=]\s*(?P<num>' + _NUMBER + r')\s?(?P<scale>thousand|million|billion|[km])?\b',
+    re.IGNORECASE
+)
+
+# Line-item labels. Alternatives are ordered so that the longest phrase wins
+# ("cost of sales" before "sales", "net profit margin" before "gross margin").
+# Per-unit costs ("unit cost", "cost to produce one") are deliberately not COGS.
+LABEL_RE = re.compile(
+    r'\b(?:'
+    r'(?P<cogs>cogs|cost of goods(?: sold)?|cost of sales|cost of revenue|costs? of produc\w*|production costs?)'
+    r'|(?P<net_loss>net loss)'
+    r'|(?P<net_profit>net profit(?: margin)?|net income|net earnings|bottom line)'
+    r'|(?P<gross_margin>gross margin|gross profit)'
+    r'|(?P<fixed_costs>fixed costs?|fixed expenses|operating expenses|opex|overheads?)'
+    r'|(?P<gross_sales>gross sales|total sales|gross revenue|total revenue|revenues?|sales)'
+    r')\b',
+    re.IGNORECASE
+)
+
+# Decimal points ("$4.5M") do not end a sentence
+SENTENCE_RE = re.compile(r'(?:[^.!?\n]|\.(?=\d))+(?:[.!?]|\n|$)')
+
+# A label further away than this (in characters, within a sentence) is not
+# considered to describe an amount.
+_MAX_LABEL_DISTANCE = 120
+
+
+def _parse_number(num, scale=None):
+    value = float(num.replace(',', ''))
+    if scale:
+        value *= _SCALES[scale.lower()]
+    return value
+
+
+def format_money(value):
+    """Format a dollar amount the way pitches state them."""
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    if value >= 1e9:
+        return f"{sign}${value / 1e9:g} billion"
+    if value >= 1e6:
+        return f"{sign}${value / 1e6:g} million"
+    return f"{sign}${value:,.0f}"
+
+
+def _label(field):
+    """Lower-case line-item label for use mid-sentence."""
+    return "COGS" if field == "cogs" else FIELD_LABELS[field].lower()
+
+
+def _format_value(field, value):
+    if field == "transactions":
+        return f"{value:,.0f}"
+    return format_money(value)
+
+
+def _money_in(sentence):
+    """Return (start, end, value) for every monetary amount in a sentence."""
+    found = []
+    for match in MONEY_RE.finditer(sentence):
+        value = _parse_number(match.group('num'), match.group('scale'))
+        if match.group('neg'):
+            value = -value
+        found.append((match.start(), match.end(), value))
+    for match in MONEY_WORDS_RE.finditer(sentence):
+        if not any(s <= match.start() < e for s, e, _ in found):
+            found.append((match.start(), match.end(), _parse_number(match.group('num'), match.group('scale'))))
+    return sorted(found)
+
+
+def _figure_field(label):
+    """The figure a label records; a net loss is a negative net profit."""
+    return "net_profit" if label == "net_loss" else label
+
+
+def _nearest_label(labels, start, end, claimed=()):
+    """
+    Pick the label that describes the amount at [start, end), preferring a preceding one.
+    When the preceding label already has its amount, a following label is tried instead
+    ("net profit reaches $2 million after $1 million in fixed costs").
+    """
+    preceding = [(start - l_end, field) for l_start, l_end, field in labels if l_end <= start]
+    following = [(l_start - end, field) for l_start, l_end, field in labels if l_start >= end]
+    preceding = [c for c in preceding if c[0] <= _MAX_LABEL_DISTANCE]
+    following = [c for c in following if c[0] <= _MAX_LABEL_DISTANCE // 4]
+    if preceding and _figure_field(min(preceding)[1]) not in claimed:
+        return min(preceding)[1]
+    following = [c for c in following if _figure_field(c[1]) not in claimed]
+    if following:
+        return min(following)[1]
+    return None
+
+
+def _scan(text, source):
+    """Scan one text for line-item figures and raw amounts, percentages and counts."""
+    figures = []
+    amounts = []
+    percentages = []
+    counts = []
+
+    for sentence_match in SENTENCE_RE.finditer(text):
+        sentence = sentence_match.group(0)
+        if not sentence.strip():
+            continue
+        context = sentence.strip()
+
+        labels = []
+        for match in LABEL_RE.finditer(sentence):
+            field = match.lastgroup
+            labels.append((match.start(), match.end(), field))
+
+        claimed = set()
+        for start, end, value in _money_in(sentence):
+            amounts.append({"value": value, "text": sentence[start:end].strip(), "context": context, "source": source})
+            field = _nearest_label(labels, start, end, claimed)
+            if field is None:
+                continue
+            if field == "net_loss":
+                field, value = "net_profit", -abs(value)
+            claimed.add(field)
+            figures.append({"field": field, "value": value, "text": sentence[start:end].strip(),
+                            "context": context, "source": source})
+
+        for match in PERCENT_RE.finditer(sentence):
+            percentages.append({"value": float(match.group('num')), "text": match.group(0), "context": context, "source": source})
+
+        for match in COUNT_RE.finditer(sentence):
+            value = _parse_number(match.group('num'), match.group('scale'))
+            unit = match.group('unit').lower()
+            counts.append({"value": value, "unit": unit, "text": match.group(0), "context": context, "source": source})
+            if unit.startswith(("transaction", "order")) or (unit == "sales" and "gross" not in match.group(0).lower()):
+                figures.append({"field": "transactions", "value": value, "text": match.group(0),
+                                "context": context, "source": source})
+
+        for match in TRANSACTIONS_LABEL_RE.finditer(sentence):
+            value = _parse_number(match.group('num'), match.group('scale'))
+            figures.append({"field": "transactions", "value": value, "text": match.group(0),
+                            "context": context, "source": source})
+
+    return figures, amounts, percentages, counts
+
+
+def _close(a, b, tolerance):
+    return abs(a - b) <= tolerance
+
+
+def validate_financial_figures(figures):
+    """
+    Check the arithmetic between the extracted line items.
+    Returns a list of checks, each with the expected and reported values.
+    """
+    values = {field: item["value"] for field, item in figures.items()}
+    scale = max([abs(v) for f, v in values.items() if f != "transactions"] or [0])
+    tolerance = max(0.01 * scale, 1.0)
+    checks = []
+
+    margin = values.get("gross_margin")
+    if "gross_sales" in values and "cogs" in values:
+        expected = values["gross_sales"] - values["cogs"]
+        if margin is not None:
+            checks.append({
+                "name": "gross_margin",
+                "formula": "gross sales - COGS",
+                "expected": expected,
+                "reported": margin,
+                "ok": _close(expected, margin, tolerance),
+            })
+        else:
+            # Derive the margin so the net profit can still be checked
+            margin = expected
+
+    if margin is not None and "fixed_costs" in values and "net_profit" in values:
+        expected = margin - values["fixed_costs"]
+        checks.append({
+            "name": "net_profit",
+            "formula": "gross margin - fixed costs",
+            "expected": expected,
+            "reported": values["net_profit"],
+            "ok": _close(expected, values["net_profit"], tolerance),
+        })
+
+    return checks
+
+
+def extract_financial_figures(presentation_text, transcript):
+    """
+    Extract a structured financial record from the slides and transcript.
+    Slide figures take precedence; differing transcript figures are recorded as conflicts.
+    """
+    figures = {}
+    conflicts = []
+    amounts = []
+    percentages = []
+    counts = []
+
+    for text, source in ((presentation_text or "", "slides"), (transcript or "", "transcript")):
+        found, source_amounts, source_percentages, source_counts = _scan(text, source)
+        amounts.extend(source_amounts)
+        percentages.extend(source_percentages)
+        counts.extend(source_counts)
+        for item in found:
+            field = item.pop("field")
+            if field not in figures:
+                figures[field] = item
+            elif figures[field]["source"] != source and not _close(figures[field]["value"], item["value"], 0.5):
+                conflicts.append({
+                    "field": field,
+                    figures[field]["source"]: figures[field]["value"],
+                    source: item["value"],
+                })
+
+    return {
+        "figures": figures,
+        "missing": [field for field in FIELDS if field not in figures],
+        "checks": validate_financial_figures(figures),
+        "conflicts": conflicts,
+        "amounts": amounts,
+        "percentages": percentages,
+        "counts": counts,
+    }
+
+
+def format_financial_facts(record):
+    """Render the verified financial record as plain text for the evaluation prompt."""
+    lines = []
+    for field in FIELDS:
+        label = FIELD_LABELS[field]
+        if field in record["figures"]:
+            item = record["figures"][field]
+            lines.append(f"- {label}: {_format_value(field, item['value'])} (stated in {item['source']})")
+        else:
+            lines.append(f"- {label}: not stated")
+
+    for check in record["checks"]:
+        status = "consistent" if check["ok"] else "INCONSISTENT"
+        lines.append(
+            f"- Check {_label(check['name'])} = {check['formula']}: expected "
+            f"{format_money(check['expected'])}, reported {format_money(check['reported'])} -> {status}"
+        )
+
+    for conflict in record["conflicts"]:
+        label = FIELD_LABELS[conflict["field"]]
+        stated = ", ".join(
+            f"{_format_value(conflict['field'], value)} in {source}"
+            for source, value in conflict.items() if source != "field"
+        )
+        lines.append(f"- Conflict: {label} is stated differently ({stated})")
+
+    return "\n".join(lines)
+
+
+def score_financials(record):
+    """
+    Score the Financial Overview criterion from the verified record.
+    Returns (score, feedback, strengths, improvements).
+    """
+    present = [field for field in FIELDS if field in record["figures"]]
+    failed = [check for check in record["checks"] if not check["ok"]]
+
+    score = len(present) / len(FIELDS) * 100
+    score -= 15 * len(failed)
+    score -= 5 * len(record["conflicts"])
+    score = min(100, max(60, score))
+
+    strengths = []
+    improvements = []
+    if present:
+        strengths.append("States " + ", ".join(_label(f) for f in present))
+    if record["checks"] and not failed:
+        strengths.append("Figures are arithmetically consistent")
+    if record["missing"]:
+        improvements.append("Add " + ", ".join(_label(f) for f in record["missing"]))
+    for check in failed:
+        improvements.append(
+            f"Reconcile {_label(check['name'])}: {check['formula']} gives "
+            f"{format_money(check['expected'])}, not {format_money(check['reported'])}"
+        )
+    for conflict in record["conflicts"]:
+        improvements.append(f"Use the same {_label(conflict['field'])} figure on the slides and in the pitch")
+    if not improvements:
+        improvements.append("Explain the assumptions behind the projections")
+
+    if not record["missing"] and not failed and not record["conflicts"]:
+        feedback = ("Solid financial breakdown: gross sales, transactions, COGS, gross margin, fixed costs and net profit "
+                    "are all stated and the arithmetic checks out. Consider adding more detail about how fixed costs are calculated.")
+    elif failed:
+        feedback = "The financial figures do not add up. " + "; ".join(improvements) + "."
+    else:
+        feedback = "Financial projections are incomplete or inconsistent. " + "; ".join(improvements) + "."
+
+    return score, feedback, strengths, improvements
@@ -0,0 +1,214 @@
+# pipeline.py
+"""
+The evaluation pipeline shared by the Streamlit UI and the HTTP service:
+text extraction from the uploaded files, the evaluation prompt, the Claude
+evaluation and the local fallback scorer. Nothing here depends on Streamlit.
+"""
+import os
+import tempfile
+
+import speech_recognition as sr
+from pydub import AudioSegment
+import docx
+import pptx
+import fitz  # PyMuPDF
+
+from alignment import format_timeline
+from financials import extract_financial_figures, format_financial_facts, score_financials
+from rubric import load_rubric
+from evaluator import CascadePolicy, evaluate_with_cascade
+from revisions import changed_sections, get_revision_store, record_provenance, reusable_sections
+
+def extract_text_from_docx(file):
+    """Extract text from a DOCX file."""
+    doc = docx.Document(file)
+    full_text = []
+    for para in doc.paragraphs:
+        full_text.append(para.text)
+    return '\n'.join(full_text)
+
+def extract_slides_from_pdf(file):
+    """Extract the text of each page of a PDF file."""
+    pdf_file = fitz.open(stream=file.read(), filetype="pdf")
+    return [pdf_file[page_num].get_text() for page_num in range(len(pdf_file))]
+
+def extract_slides_from_pptx(file):
+    """Extract the text of each slide of a PPTX file."""
+    prs = pptx.Presentation(file)
+    slides = []
+    for slide in prs.slides:
+        text = []
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                text.append(shape.text)
+        slides.append('\n'.join(text))
+    return slides
+
+def extract_audio_transcript(audio_file, file_extension):
+    """Extract transcript from audio file."""
+    # For demonstration, we'll return a mock transcript
+    # In a real application, you'd use speech_recognition or another API
+    # to actually transcribe the audio
+    
+    # This would be the real implementation:
+    # with tempfile.NamedTemporaryFile(suffix=file_extension) as temp_audio:
+    #     temp_audio.write(audio_file.read())
+    #     temp_audio.flush()
+    #     
+    #     # Convert to wav if needed
+    #     if file_extension != '.wav':
+    #         sound = AudioSegment.from_file(temp_audio.name, format=file_extension[1:])
+    #         wav_path = temp_audio.name.replace(file_extension, '.wav')
+    #         sound.export(wav_path, format='wav')
+    #         audio_path = wav_path
+    #     else:
+    #         audio_path = temp_audio.name
+    #     
+    #     # Use speech recognition
+    #     recognizer = sr.Recognizer()
+    #     with sr.AudioFile(audio_path) as source:
+    #         audio_data = recognizer.record(source)
+    #         transcript = recognizer.recognize_google(audio_data)
+    #         return transcript
+    
+    # For demo purposes, return a mock transcript based on the sample in the instructions
+    return """Good afternoon, everyone. I'm here to talk about a problem that's been plaguing businesses and individuals alike - the inefficiency of current widgets in the market. These widgets, which are supposed to make our lives easier, are instead causing us to waste precious time and resources. In fact, 70% of users have reported dissatisfaction with these widgets, and businesses are losing an average of 20 hours per week due to their inefficiency.
+
+But what if I told you we have a solution? A solution that not only addresses this problem but does so in a way that saves time and resources. We've developed a new kind of widget, one that's designed for maximum efficiency. Our early testing shows that it reduces time wasted by 50%, and we've seen a 95% satisfaction rate among our test users.
+
+Let me paint a picture for you. Imagine a business that's currently losing 20 hours a week due to widget inefficiency. With our new widget, they could potentially save 10 hours a week. That's 10 hours that could be spent on more productive tasks, leading to increased output and profits.
+
+Our business model is simple and effective. We sell our widgets directly to businesses and individuals. By providing a product that offers real value and saves time, we're confident that our widgets will be in high demand. In fact, our market research shows a potential customer base of 1 million users.
+
+Let's talk numbers. We project gross sales of $5 million in the first year, based on an estimated 500,000 transactions. The cost of producing these widgets is $2 million, leaving us with a gross margin of $3 million. After accounting for fixed costs of $1 million, we're looking at a net profit margin of $2 million.
+
+In conclusion, we're offering a solution to a widespread problem, with a compelling business model and sustainable finances. We're not just selling widgets - we're selling efficiency, time savings, and satisfaction. Thank you for your time, and I look forward to your questions."""
+
+def extract_presentation_slides(file, filename):
+    """Extract the text of each slide; a Word document counts as a single slide."""
+    if filename.endswith(('.doc', '.docx')):
+        return [extract_text_from_docx(file)]
+    elif filename.endswith('.pdf'):
+        return extract_slides_from_pdf(file)
+    elif filename.endswith(('.ppt', '.pptx')):
+        return extract_slides_from_pptx(file)
+    return []
+
+def build_evaluation_prompt(presentation_text, transcript, rubric, timeline=None):
+    """Build the Claude prompt for a pitch, including the locally verified financial facts and slide timeline."""
+    # Extract and check the financial figures locally so Claude doesn't have to re-derive them
+    extra_context = []
+    if any(section["scorer"] == "financials" for section in rubric.sections):
+        financial_record = extract_financial_figures(presentation_text, transcript)
+        extra_context.append((
+            "VERIFIED FINANCIAL FACTS (extracted from the slides and transcript and checked arithmetically; "
+            "use these for the Financial Overview instead of re-deriving the figures)",
+            format_financial_facts(financial_record)
+        ))
+    if timeline:
+        extra_context.append((
+            "SLIDE TIMELINE (estimated by aligning the transcript with the slides, with time spread by word count; "
+            "use this to judge how the talk is divided across the slides in Delivery & Impact)",
+            format_timeline(timeline)
+        ))
+    
+    # The compiled rubric prefix followed by this pitch's content
+    return rubric.build_prompt(presentation_text, transcript, extra_context)
+
+def evaluate_presentation(client, presentation_text, transcript, rubric=None, policy=None, base_sections=None, timeline=None):
+    """
+    Evaluate a pitch with Claude.
+    A fast model scores first and the large model is only used near grade boundaries
+    or when the financial score contradicts the locally verified figures.
+    The response schema is enforced with a tool call; only missing or invalid
+    sections are re-requested, and only sections that still fail are scored locally.
+    Sections in base_sections are carried over and not sent to Claude, and the
+    slide timeline, if given, is added to the prompt for judging delivery.
+    """
+    rubric = rubric or load_rubric()
+    prompt = build_evaluation_prompt(presentation_text, transcript, rubric, timeline)
+    # The fast model's financial scores are checked against the locally verified figures
+    reference_scores = {}
+    financial_sections = [section["id"] for section in rubric.sections if section["scorer"] == "financials"]
+    if financial_sections:
+        score = score_financials(extract_financial_figures(presentation_text, transcript))[0]
+        reference_scores = {section_id: score for section_id in financial_sections}
+    return evaluate_with_cascade(
+        client, rubric, prompt,
+        policy=policy or CascadePolicy.from_env(),
+        fallback_sections=lambda: analyze_presentation_fallback(presentation_text, transcript, rubric)["sections"],
+        base_sections=base_sections,
+        reference_scores=reference_scores
+    )
+
+def evaluate_revision(submission_key, slides, transcript, rubric, evaluate):
+    """
+    Evaluate a (re)submission incrementally against the previous revision with the same key.
+    evaluate(base_sections) performs the evaluation of the sections not in base_sections;
+    it is not called at all when nothing changed. The result records the provenance of each section.
+    """
+    store = get_revision_store()
+    previous = store.latest(submission_key, rubric.key)
+    changed = changed_sections(previous, slides, transcript, rubric)
+    base_sections = reusable_sections(previous, changed, rubric)
+
+    if changed:
+        result = evaluate(base_sections)
+    else:
+        # Identical resubmission: the previous evaluation stands as a whole
+        result = {key: value for key, value in previous["evaluation"].items() if key not in ("provenance", "revision")}
+
+    number = previous["number"] + 1 if previous else 1
+    record_provenance(result, previous, number, base_sections)
+    # A concurrent evaluation of the same key may have taken the number; the store renumbers the result
+    store.add_revision(submission_key, rubric.key, number, slides, transcript, result)
+    return result
+    
+def analyze_presentation_fallback(presentation_text, transcript, rubric=None):
+    """
+    Fallback analysis method if Claude API call fails, and the provisional score shown while Claude evaluates.
+    Uses basic text matching and rules to generate scores and feedback; the same pitch always gets the same result.
+    """
+    rubric = rubric or load_rubric()
+    
+    # Count the mentions of each section's indicators in the combined text in one pass
+    combined_text = presentation_text + " " + transcript
+    coverage = rubric.indicator_coverage(combined_text)
+    
+    sections = {}
+    for section in rubric.sections:
+        if section["scorer"] == "financials":
+            # Financials are judged from the extracted figures and their arithmetic
+            financial_record = extract_financial_figures(presentation_text, transcript)
+            score, feedback, strengths, improvements = score_financials(financial_record)
+        else:
+            if section["scorer"] == "delivery":
+                # For delivery, we analyze the transcript length against the ideal word count for the time limit
+                word_count = len(transcript.split())
+                score = next(
+                    (band["score"] for band in section["word_count_scores"] if band["min"] <= word_count <= band["max"]),
+                    section["default_score"]
+                )
+            else:
+                score = coverage.get(section["id"], 0) * 100
+            score = min(100, max(60, score))
+            feedback = section["feedback"][rubric.feedback_level(score)]
+            strengths = section["strengths"]
+            improvements = section["improvements"]
+        
+        sections[section["id"]] = {
+            "score": round(score, 1),
+            "feedback": feedback,
+            "strengths": strengths,
+            "improvements": improvements
+        }
+    
+    # Calculate overall score (weighted)
+    overall_score = rubric.overall_score({section_id: data["score"] for section_id, data in sections.items()})
+    
+    # Return results
+    return {
+        "overall": round(overall_score, 1),
+        "sections": sections,
+        "rubric": rubric.key
+    }
@@ -0,0 +1,355 @@
+# probe.py
+"""
+Header-only probing of uploaded files.
+
+Runs as soon as a file is uploaded and reads only magic bytes, container
+headers and metadata: audio duration and sample rate from the WAV/MP3/OGG/M4A
+headers, page count from the PDF cross-reference table, slide count from the
+PPTX zip directory. Files that break the assignment limits are rejected or
+flagged before any extraction, transcription or API time is spent.
+"""
+import os
+import re
+import struct
+import zipfile
+
+import fitz  # PyMuPDF
+
+# Over the time limit by more than this is flagged
+OVERTIME_GRACE_SECONDS = 15
+# Recordings longer than this multiple of the time limit are rejected outright
+REJECT_DURATION_FACTOR = 2.0
+# Decks with more than this multiple of the expected slides are rejected outright
+REJECT_SLIDE_FACTOR = 3
+MIN_SAMPLE_RATE = 8000
+
+MAGIC = [
+    (b"%PDF-", "pdf"),
+    (b"PK\x03\x04", "zip"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "ole"),
+    (b"ID3", "mp3"),
+    (b"OggS", "ogg"),
+]
+
+EXPECTED_FORMATS = {
+    ".pdf": "pdf",
+    ".pptx": "zip",
+    ".docx": "zip",
+    ".ppt": "ole",
+    ".doc": "ole",
+    ".mp3": "mp3",
+    ".wav": "wav",
+    ".ogg": "ogg",
+    ".m4a": "mp4",
+}
+
+_SLIDE_RE = re.compile(r"ppt/slides/slide\d+\.xml$")
+_DOCX_PAGES_RE = re.compile(rb"<Pages>(\d+)</Pages>")
+
+# MPEG audio frame header tables
+_MP3_BITRATES = {
+    # (version is MPEG-1, layer) -> kbps by index
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def sniff_format(head):
+    """Identify a container format from the first bytes of a file."""
+    for magic, name in MAGIC:
+        if head.startswith(magic):
+            return name
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return "mp3"
+    return None
+
+
+def _read_at(file, offset, size):
+    file.seek(offset)
+    return file.read(size)
+
+
+def _file_size(file):
+    return file.seek(0, os.SEEK_END)
+
+
+def _new_report(file, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    report = {
+        "format": sniff_format(_read_at(file, 0, 16)),
+        "errors": [],
+        "warnings": [],
+    }
+    expected = EXPECTED_FORMATS.get(extension)
+    if report["format"] is None:
+        report["errors"].append(f"{filename} is not a recognizable {extension or 'media'} file.")
+    elif expected and report["format"] != expected:
+        report["errors"].append(f"{filename} has a {extension} extension but its contents are {report['format'].upper()}.")
+    return report
+
+
+# Presentations
+
+def _pdf_pages(file):
+    # Opening a PDF only parses the cross-reference table; no page is loaded
+    file.seek(0)
+    with fitz.open(stream=file.read(), filetype="pdf") as pdf:
+        return pdf.page_count
+
+
+def _zip_counts(file, report, extension):
+    # Only the zip central directory (and docProps/app.xml for Word) is read
+    file.seek(0)
+    with zipfile.ZipFile(file) as archive:
+        names = archive.namelist()
+        if extension == ".pptx":
+            if "ppt/presentation.xml" not in names:
+                report["errors"].append("The file is not a PowerPoint presentation.")
+                return
+            report["slides"] = sum(1 for name in names if _SLIDE_RE.match(name))
+        elif extension == ".docx":
+            if "word/document.xml" not in names:
+                report["errors"].append("The file is not a Word document.")
+                return
+            if "docProps/app.xml" in names:
+                match = _DOCX_PAGES_RE.search(archive.read("docProps/app.xml"))
+                if match:
+                    report["pages"] = int(match.group(1))
+
+
+def probe_presentation(file, filename, rubric=None):
+    """
+    Probe an uploaded presentation from its headers.
+    Returns a report with the detected format, page or slide count, errors and warnings.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    try:
+        report = _new_report(file, filename)
+        if not report["errors"]:
+            if report["format"] == "pdf":
+                report["pages"] = _pdf_pages(file)
+            elif report["format"] == "zip":
+                _zip_counts(file, report, extension)
+            elif report["format"] == "ole":
+                report["warnings"].append(f"Legacy {extension} files can't be analyzed reliably. Please save the file as .pptx or .pdf.")
+    except (zipfile.BadZipFile, RuntimeError, ValueError) as e:
+        report = {"format": None, "errors": [f"{filename} appears to be damaged: {e}"], "warnings": []}
+    finally:
+        file.seek(0)
+
+    count = report.get("slides", report.get("pages"))
+    expected = rubric.slide_count if rubric else None
+    if count is not None and expected:
+        unit = "slides" if "slides" in report else "pages"
+        if count > expected * REJECT_SLIDE_FACTOR:
+            report["errors"].append(f"The presentation has {count} {unit}; the assignment calls for exactly {expected} slides.")
+        elif count != expected:
+            report["warnings"].append(f"The presentation has {count} {unit}; the assignment calls for exactly {expected} slides.")
+    return report
+
+
+# Audio
+
+def _probe_wav(file, report):
+    offset = 12
+    byte_rate = None
+    size = _file_size(file)
+    while offset + 8 <= size:
+        chunk_id, chunk_size = struct.unpack("<4sI", _read_at(file, offset, 8))
+        if chunk_id == b"fmt ":
+            _, channels, sample_rate, byte_rate = struct.unpack("<HHII", _read_at(file, offset + 8, 12))
+            report["channels"] = channels
+            report["sample_rate"] = sample_rate
+        elif chunk_id == b"data":
+            if byte_rate:
+                # Streaming writers leave the size at its maximum; use the file size instead
+                data_size = min(chunk_size, size - offset - 8)
+                report["duration"] = data_size / byte_rate
+            return
+        offset += 8 + chunk_size + (chunk_size & 1)
+
+
+def _synchsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _probe_mp3(file, report):
+    size = _file_size(file)
+    offset = 0
+    head = _read_at(file, 0, 10)
+    if head.startswith(b"ID3"):
+        offset = 10 + _synchsafe(head[6:10])
+
+    # Find the first frame header within the first few KB after the tag
+    window = _read_at(file, offset, 8192)
+    for position in range(len(window) - 4):
+        if window[position] != 0xFF or window[position + 1] & 0xE0 != 0xE0:
+            continue
+        header = struct.unpack(">I", window[position:position + 4])[0]
+        version_bits = (header >> 19) & 3
+        layer = 4 - ((header >> 17) & 3)
+        bitrate_index = (header >> 12) & 15
+        rate_index = (header >> 10) & 3
+        if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        mpeg1 = version_bits == 3
+        sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+        bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+        mono = (header >> 6) & 3 == 3
+        samples_per_frame = 384 if layer == 1 else (1152 if mpeg1 or layer == 2 else 576)
+        report["sample_rate"] = sample_rate
+        report["channels"] = 1 if mono else 2
+
+        # VBR files carry the frame count in a Xing/Info or VBRI header in the first frame
+        frame = window[position:position + 200]
+        side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+        xing = frame[4 + side_info:4 + side_info + 12]
+        if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 1:
+            frames = struct.unpack(">I", xing[8:12])[0]
+            report["duration"] = frames * samples_per_frame / sample_rate
+        elif frame[36:40] == b"VBRI":
+            frames = struct.unpack(">I", frame[50:54])[0]
+            report["duration"] = frames * samples_per_frame / sample_rate
+        else:
+            # Constant bitrate: the audio size gives the duration
+            report["duration"] = (size - offset - position) * 8 / bitrate
+        return
+
+
+def _probe_ogg(file, report):
+    first_page = _read_at(file, 0, 512)
+    segments = first_page[26]
+    packet = first_page[27 + segments:]
+    pre_skip = 0
+    if packet.startswith(b"\x01vorbis"):
+        report["channels"] = packet[11]
+        report["sample_rate"] = granule_rate = struct.unpack("<I", packet[12:16])[0]
+    elif packet.startswith(b"OpusHead"):
+        report["channels"] = packet[9]
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+        report["sample_rate"] = struct.unpack("<I", packet[12:16])[0] or 48000
+        granule_rate = 48000  # Opus granule positions always count 48 kHz samples
+    else:
+        return
+
+    # The granule position of the last page is the total sample count
+    size = _file_size(file)
+    tail_start = max(0, size - 65536)
+    tail = _read_at(file, tail_start, size - tail_start)
+    last_page = tail.rfind(b"OggS")
+    # A zero sample rate only comes from a corrupt header; the duration is then unknown
+    if granule_rate and last_page >= 0 and last_page + 14 <= len(tail):
+        granule = struct.unpack("<q", tail[last_page + 6:last_page + 14])[0]
+        if granule > 0:
+            report["duration"] = max(0, granule - pre_skip) / granule_rate
+
+
+def _mp4_boxes(data, offset=0, end=None):
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _probe_mp4(file, report):
+    # Walk the top-level boxes by seeking past them; only the small moov box is read
+    size = _file_size(file)
+    offset = 0
+    moov = None
+    while offset + 8 <= size:
+        box_size, box_type = struct.unpack(">I4s", _read_at(file, offset, 8))
+        if box_size == 1:
+            box_size = struct.unpack(">Q", _read_at(file, offset + 8, 8))[0]
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < 8:
+            return
+        if box_type == b"moov":
+            moov = _read_at(file, offset, box_size)
+            break
+        offset += box_size
+    if moov is None:
+        return
+
+    for box_type, start, end in _mp4_boxes(moov):
+        if box_type != b"moov":
+            continue
+        for child_type, child_start, child_end in _mp4_boxes(moov, start, end):
+            if child_type == b"mvhd":
+                version = moov[child_start]
+                if version == 1:
+                    timescale, duration = struct.unpack(">IQ", moov[child_start + 20:child_start + 32])
+                else:
+                    timescale, duration = struct.unpack(">II", moov[child_start + 12:child_start + 20])
+                if timescale:
+                    report["duration"] = duration / timescale
+            elif child_type == b"trak" and "sample_rate" not in report:
+                for media_type, media_start, media_end in _mp4_boxes(moov, child_start, child_end):
+                    if media_type != b"mdia":
+                        continue
+                    for header_type, header_start, _ in _mp4_boxes(moov, media_start, media_end):
+                        if header_type == b"mdhd":
+                            # The audio track's media timescale is its sample rate
+                            version = moov[header_start]
+                            timescale_offset = header_start + (20 if version == 1 else 12)
+                            report["sample_rate"] = struct.unpack(">I", moov[timescale_offset:timescale_offset + 4])[0]
+
+
+_AUDIO_PROBES = {
+    "wav": _probe_wav,
+    "mp3": _probe_mp3,
+    "ogg": _probe_ogg,
+    "mp4": _probe_mp4,
+}
+
+
+def probe_audio(file, filename, rubric=None):
+    """
+    Probe an uploaded recording from its headers.
+    Returns a report with the detected format, duration (seconds), sample rate, errors and warnings.
+    """
+    try:
+        report = _new_report(file, filename)
+        if not report["errors"] and report["format"] in _AUDIO_PROBES:
+            _AUDIO_PROBES[report["format"]](file, report)
+    except (struct.error, IndexError, KeyError, ValueError, ZeroDivisionError) as e:
+        report = {"format": None, "errors": [f"{filename} appears to be damaged: {e}"], "warnings": []}
+    finally:
+        file.seek(0)
+
+    if not report["errors"] and "duration" not in report:
+        report["warnings"].append("Couldn't read the recording length from the file headers.")
+
+    duration = report.get("duration")
+    limit = rubric.duration_minutes * 60 if rubric and rubric.duration_minutes else None
+    if duration is not None and limit:
+        length = f"{int(duration // 60)}:{int(duration % 60):02d}"
+        if duration > limit * REJECT_DURATION_FACTOR:
+            report["errors"].append(f"The recording is {length} long; the pitch must fit in {rubric.duration_minutes} minutes.")
+        elif duration > limit + OVERTIME_GRACE_SECONDS:
+            report["warnings"].append(f"The recording is {length} long, over the {rubric.duration_minutes}-minute limit.")
+        elif duration < limit / 2:
+            report["warnings"].append(f"The recording is only {length} long for a {rubric.duration_minutes}-minute pitch.")
+
+    sample_rate = report.get("sample_rate")
+    if sample_rate and sample_rate < MIN_SAMPLE_RATE:
+        report["warnings"].append(f"The recording's {sample_rate} Hz sample rate is too low for reliable transcription.")
+    return report
@@ -0,0 +1,300 @@
+# revisions.py
+"""
+Incremental re-evaluation of resubmitted pitches.
+
+Every evaluated submission is stored as a revision under its submission key
+(course and student or team) in the SQLite history. When the same key submits
+again, the new slides are compared with the previous revision slide by slide
+and the transcript segment by segment. Each changed slide or segment is
+attributed to the rubric sections it feeds, only those sections are sent to
+Claude, and the rest are carried over with a record of the revision that
+actually scored them.
+"""
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+from contextlib import closing
+from functools import lru_cache
+
+from dedup import DEFAULT_HISTORY_PATH
+from financials import MONEY_RE, SENTENCE_RE, extract_financial_figures
+
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+_SPACE_RE = re.compile(r'\s+')
+# Attempts at storing a revision under the next free number when another one took it first
+STORE_ATTEMPTS = 5
+
+
+def _normalize(text):
+    """Whitespace-insensitive form of a slide or segment for comparison."""
+    return _SPACE_RE.sub(" ", text or "").strip().lower()
+
+
+def _digest(text):
+    return hashlib.sha256(_normalize(text).encode()).hexdigest()
+
+
+def split_transcript(transcript):
+    """Split a transcript into paragraphs, or into sentences when it is one block of speech."""
+    paragraphs = [p.strip() for p in _PARAGRAPH_RE.split(transcript or "") if p.strip()]
+    if len(paragraphs) > 1:
+        return paragraphs
+    return [s.strip() for s in SENTENCE_RE.findall(transcript or "") if s.strip()]
+
+
+class RevisionStore:
+    """Previous revisions of each submission key, kept next to the submission index."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("PITCH_HISTORY_DB", DEFAULT_HISTORY_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS revisions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    submission_key TEXT NOT NULL,
+                    rubric TEXT NOT NULL,
+                    number INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    slides TEXT NOT NULL,
+                    transcript TEXT NOT NULL,
+                    evaluation TEXT NOT NULL
+                );
+            """)
+            self._number_revisions_uniquely(conn)
+
+    @staticmethod
+    def _number_revisions_uniquely(conn):
+        # Histories written before numbers were unique may hold concurrently stored duplicates;
+        # those submission keys are renumbered in the order their revisions were stored
+        duplicated = conn.execute(
+            "SELECT DISTINCT submission_key, rubric FROM revisions "
+            "GROUP BY submission_key, rubric, number HAVING COUNT(*) > 1"
+        ).fetchall()
+        for submission_key, rubric_key in duplicated:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM revisions WHERE submission_key = ? AND rubric = ? ORDER BY number, id",
+                (submission_key, rubric_key)
+            )]
+            conn.executemany("UPDATE revisions SET number = ? WHERE id = ?", [(n, id_) for n, id_ in enumerate(ids, 1)])
+        conn.executescript("""
+            DROP INDEX IF EXISTS revision_lookup;
+            CREATE UNIQUE INDEX IF NOT EXISTS revision_number ON revisions (submission_key, rubric, number);
+        """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def latest(self, submission_key, rubric_key):
+        """The most recent revision for a submission key under a rubric, or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT number, created, slides, transcript, evaluation FROM revisions "
+                "WHERE submission_key = ? AND rubric = ? ORDER BY number DESC, id DESC LIMIT 1",
+                (submission_key, rubric_key)
+            ).fetchone()
+        if row is None:
+            return None
+        number, created, slides, transcript, evaluation = row
+        return {
+            "number": number,
+            "created": created,
+            "slides": json.loads(slides),
+            "transcript": transcript,
+            "evaluation": json.loads(evaluation),
+        }
+
+    def add_revision(self, submission_key, rubric_key, number, slides, transcript, evaluation):
+        """
+        Store an evaluated revision and return the number it was stored under.
+        When a concurrent evaluation of the same key already stored that number, the revision
+        takes the next free one and the numbers recorded in the evaluation are updated to match.
+        """
+        for attempt in range(STORE_ATTEMPTS):
+            try:
+                with closing(self._connect()) as conn, conn:
+                    conn.execute(
+                        "INSERT INTO revisions (submission_key, rubric, number, created, slides, transcript, evaluation) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (submission_key, rubric_key, number, time.time(), json.dumps(slides), transcript,
+                         json.dumps(evaluation))
+                    )
+                return number
+            except sqlite3.IntegrityError:
+                if attempt == STORE_ATTEMPTS - 1:
+                    raise
+                with closing(self._connect()) as conn:
+                    (latest,) = conn.execute(
+                        "SELECT MAX(number) FROM revisions WHERE submission_key = ? AND rubric = ?",
+                        (submission_key, rubric_key)
+                    ).fetchone()
+                _renumber(evaluation, number, latest + 1)
+                number = latest + 1
+
+
+def _renumber(evaluation, old, new):
+    """Move the revision number recorded in an evaluation and its own provenance from old to new."""
+    if "revision" in evaluation:
+        evaluation["revision"]["number"] = new
+    for provenance in evaluation.get("provenance", {}).values():
+        if provenance["source"] != "reused" and provenance["revision"] == old:
+            provenance["revision"] = new
+
+
+def _indicator_sections(text, rubric):
+    """
+    The rubric sections a text is mainly about, by whole-word indicator matches.
+    A passing mention of another section's indicator (one hit in a paragraph with five
+    for the problem) doesn't count; sections with at least half the top count do.
+    """
+    counts = Counter(section_id for section_id, _ in rubric.matcher.find(text, whole_words=True))
+    if not counts:
+        return set()
+    top = max(counts.values())
+    return {section_id for section_id, count in counts.items() if count * 2 >= top}
+
+
+def _segment_sections(segments, rubric):
+    """
+    Attribute each transcript segment to the rubric sections it talks about.
+    Segments without any indicator belong to the same sections as the segment before them.
+    """
+    slide_sections = [section["id"] for section in rubric.sections if section.get("slide")]
+    financial_sections = [section["id"] for section in rubric.sections if section["scorer"] == "financials"]
+
+    attributed = []
+    for segment in segments:
+        hits = _indicator_sections(segment, rubric)
+        if MONEY_RE.search(segment):
+            hits.update(financial_sections)
+        attributed.append(hits)
+
+    # Carry attributions forward, then backward for any leading segments
+    current = set()
+    for hits in attributed:
+        if hits:
+            current = hits
+        else:
+            hits.update(current)
+    current = set()
+    for hits in reversed(attributed):
+        if hits:
+            current = hits
+        else:
+            hits.update(current)
+    return [hits or set(slide_sections) for hits in attributed]
+
+
+def changed_sections(previous, slides, transcript, rubric):
+    """
+    Rubric sections whose inputs differ from the previous revision, in rubric order.
+    Every section counts as changed when there is no reusable previous evaluation.
+    """
+    evaluation = previous["evaluation"] if previous else None
+    # Only Claude evaluations are carried over; a fully local fallback result is re-evaluated
+    if not evaluation or "meta" not in evaluation:
+        return list(rubric.section_ids)
+
+    changed = set(evaluation["meta"].get("fallback_sections", []))
+    slide_sections = {section["slide"]: section["id"] for section in rubric.sections if section.get("slide")}
+
+    # Slides are compared by position; slide n feeds the section presented on slide n
+    old_slides = previous["slides"]
+    for index in range(max(len(old_slides), len(slides))):
+        old = old_slides[index] if index < len(old_slides) else ""
+        new = slides[index] if index < len(slides) else ""
+        if _digest(old) == _digest(new):
+            continue
+        if index + 1 in slide_sections:
+            changed.add(slide_sections[index + 1])
+        else:
+            # Extra slides are attributed by content, or to every slide section if nothing matches
+            hits = _indicator_sections(old, rubric) | _indicator_sections(new, rubric)
+            changed.update(hits or slide_sections.values())
+
+    # Transcript segments are aligned with a diff so an inserted sentence doesn't shift everything after it
+    old_segments = split_transcript(previous["transcript"])
+    new_segments = split_transcript(transcript)
+    old_sections = _segment_sections(old_segments, rubric)
+    new_sections = _segment_sections(new_segments, rubric)
+    matcher = difflib.SequenceMatcher(
+        None, [_digest(s) for s in old_segments], [_digest(s) for s in new_segments], autojunk=False
+    )
+    transcript_changed = False
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        transcript_changed = True
+        for hits in old_sections[i1:i2] + new_sections[j1:j2]:
+            changed.update(hits)
+
+    for section in rubric.sections:
+        if section["scorer"] == "financials":
+            # A changed figure anywhere changes the arithmetic the section is judged on
+            old_figures = extract_financial_figures("\n".join(old_slides), previous["transcript"])["figures"]
+            new_figures = extract_financial_figures("\n".join(slides), transcript)["figures"]
+            if old_figures != new_figures:
+                changed.add(section["id"])
+        elif section["scorer"] == "delivery":
+            # Delivery depends on the whole talk and the deck length
+            if transcript_changed or len(old_slides) != len(slides):
+                changed.add(section["id"])
+
+    return [section_id for section_id in rubric.section_ids if section_id in changed]
+
+
+def reusable_sections(previous, changed, rubric):
+    """Section results of the previous revision that can be carried over unchanged."""
+    if not previous or "meta" not in previous["evaluation"]:
+        return {}
+    sections = previous["evaluation"]["sections"]
+    return {
+        section_id: sections[section_id]
+        for section_id in rubric.section_ids
+        if section_id not in changed and section_id in sections
+    }
+
+
+def record_provenance(result, previous, number, base_sections):
+    """Record which revision scored each section of a result and what was re-evaluated."""
+    now = time.time()
+    if "meta" in result:
+        fallback = set(result["meta"].get("fallback_sections", []))
+    else:
+        # Claude could not be used at all, so nothing was carried over either
+        base_sections = {}
+        fallback = set(result["sections"])
+    previous_provenance = previous["evaluation"].get("provenance", {}) if previous else {}
+    provenance = {}
+    for section_id in result["sections"]:
+        if section_id in base_sections:
+            # Keep pointing at the revision that actually produced the result
+            provenance[section_id] = dict(
+                previous_provenance.get(section_id)
+                or {"revision": previous["number"], "evaluated_at": previous["created"]},
+                source="reused"
+            )
+        else:
+            source = "fallback" if section_id in fallback else "evaluated"
+            provenance[section_id] = {"source": source, "revision": number, "evaluated_at": now}
+    result["provenance"] = provenance
+    result["revision"] = {
+        "number": number,
+        "previous": previous["number"] if previous else None,
+        "evaluated_sections": [section_id for section_id in result["sections"] if section_id not in base_sections],
+        "reused_sections": [section_id for section_id in result["sections"] if section_id in base_sections],
+    }
+    return result
+
+
+@lru_cache(maxsize=None)
+def get_revision_store(path=None):
+    """Return the process-wide revision store."""
+    return RevisionStore(path)
@@ -0,0 +1,316 @@
+# rubric.py
+"""
+Rubric definitions, compiled once per process.
+
+A rubric is a JSON file in the rubrics/ directory. Loading one compiles it into
+everything an evaluation needs: the static prompt prefix sent to Claude, an
+Aho-Corasick matcher for the fallback indicators, the NumPy weight vector and
+the pre-rendered HTML for the rubric tab. Compiled rubrics are cached, so batch
+runs and every Streamlit session share the same object.
+"""
+import html
+import json
+import os
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+
+RUBRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rubrics")
+DEFAULT_RUBRIC = "business_pitch"
+
+SCORERS = ("keywords", "financials", "delivery")
+REQUIRED_KEYS = ("name", "system_prompt", "bands", "sections")
+REQUIRED_BAND_KEYS = ("label", "min", "range", "color")
+REQUIRED_SECTION_KEYS = ("id", "label", "weight", "criteria")
+# Section scores at or above this get the "high" canned feedback and suggestion
+DEFAULT_FEEDBACK_THRESHOLD = 80
+# Local delivery score when the transcript length matches none of the word count bands
+DEFAULT_DELIVERY_SCORE = 65
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds every keyword in a single pass over the text."""
+
+    def __init__(self, keywords):
+        # keywords: iterable of (keyword, payload); matching is case-insensitive
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+        for keyword, payload in keywords:
+            node = 0
+            for char in keyword.lower():
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                    self._goto[node][char] = child
+                node = child
+            # The keyword length is kept so whole-word matches can check where the keyword started
+            self._out[node].add((len(keyword), payload))
+
+        # Breadth-first pass to link each state to its longest proper suffix state
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] |= self._out[self._fail[child]]
+
+    def find(self, text, whole_words=False):
+        """
+        Return the payloads of every keyword occurring in the text.
+        With whole_words, a keyword inside a longer word ("efficiency" in "inefficiency") doesn't count.
+        """
+        found = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        text = text.lower()
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, payload in out[node]:
+                if whole_words and not _is_whole_word(text, end - length + 1, end + 1):
+                    continue
+                found.add(payload)
+        return found
+
+
+def _is_whole_word(text, start, end):
+    """Whether text[start:end] isn't part of a longer word on either side."""
+    if start > 0 and text[start].isalnum() and text[start - 1].isalnum():
+        return False
+    if end < len(text) and text[end - 1].isalnum() and text[end].isalnum():
+        return False
+    return True
+
+
+class CompiledRubric:
+    """A rubric definition compiled into prompt, matcher, weights and HTML."""
+
+    def __init__(self, key, definition):
+        self.key = key
+        self._validate(definition)
+        self.name = definition["name"]
+        self.description = definition.get("description", definition["name"])
+        self.duration_minutes = definition.get("duration_minutes")
+        self.slide_count = definition.get("slide_count")
+        self.system_prompt = definition["system_prompt"]
+        self.bands = sorted(definition["bands"], key=lambda band: band["min"], reverse=True)
+        self.feedback_threshold = definition.get("feedback_threshold", DEFAULT_FEEDBACK_THRESHOLD)
+        self.sections = definition["sections"]
+        self.section_ids = [section["id"] for section in self.sections]
+        self._sections_by_id = {section["id"]: section for section in self.sections}
+
+        self.weights = np.array([section["weight"] for section in self.sections], dtype=float)
+        if not np.isclose(self.weights.sum(), 1.0):
+            raise ValueError(f"Section weights of rubric '{key}' sum to {self.weights.sum():.2f}, not 1")
+        for section in self.sections:
+            self._set_section_defaults(section)
+
+        self.matcher = KeywordAutomaton(
+            (indicator, (section["id"], position))
+            for section in self.sections
+            for position, indicator in enumerate(section.get("indicators", []))
+        )
+        self.prompt_prefix = self._render_prompt_prefix()
+        self.html_cards = self._render_html_cards()
+
+    def _validate(self, definition):
+        """Reject a definition that would only fail later, during an evaluation or in the UI."""
+        def require(mapping, keys, where):
+            missing = [k for k in keys if k not in mapping]
+            if missing:
+                raise ValueError(f"Rubric '{self.key}': {where} is missing {', '.join(missing)}")
+
+        require(definition, REQUIRED_KEYS, "the definition")
+        if not definition["bands"] or not definition["sections"]:
+            raise ValueError(f"Rubric '{self.key}' needs at least one band and one section")
+        for band in definition["bands"]:
+            require(band, REQUIRED_BAND_KEYS, f"band {band.get('label', '?')!r}")
+        ids = set()
+        for section in definition["sections"]:
+            require(section, REQUIRED_SECTION_KEYS, f"section {section.get('id', '?')!r}")
+            if section["id"] in ids:
+                raise ValueError(f"Rubric '{self.key}': duplicate section id {section['id']!r}")
+            ids.add(section["id"])
+            scorer = section.get("scorer", "keywords")
+            if scorer not in SCORERS:
+                raise ValueError(f"Rubric '{self.key}': section {section['id']!r} has unknown scorer {scorer!r}")
+            for name in ("feedback", "suggestions"):
+                if name in section:
+                    require(section[name], ("high", "low"), f"{name} of section {section['id']!r}")
+
+    @staticmethod
+    def _set_section_defaults(section):
+        """Fill in the optional section keys so later code can rely on them."""
+        label = section["label"]
+        section.setdefault("weight_label", f"{section['weight']:.0%}")
+        section.setdefault("short_label", label)
+        section.setdefault("scorer", "keywords")
+        section.setdefault("levels", [])
+        section.setdefault("key_elements", "; ".join(section["criteria"]))
+        section.setdefault("guideline", label)
+        section.setdefault("indicators", [])
+        section.setdefault("strengths", [])
+        section.setdefault("improvements", [])
+        section.setdefault("feedback", {
+            "high": f"{label} meets most of the criteria.",
+            "low": f"{label} needs more work against the criteria.",
+        })
+        review = f"Review the {label} criteria: " + "; ".join(section["criteria"]) + "."
+        section.setdefault("suggestions", {"high": review, "low": review})
+        if section["scorer"] == "delivery":
+            section.setdefault("word_count_scores", [])
+            section.setdefault("default_score", DEFAULT_DELIVERY_SCORE)
+
+    def section(self, section_id):
+        return self._sections_by_id[section_id]
+
+    def _render_prompt_prefix(self):
+        criteria = []
+        for number, section in enumerate(self.sections, 1):
+            criteria.append(f"{number}. {section['label']} ({section['weight_label']}):")
+            criteria.extend(f"   - {criterion}" for criterion in section["criteria"])
+            criteria.append("")
+
+        section_format = ',\n'.join(
+            f'        "{section_id}": {{\n'
+            '            "score": [score],\n'
+            '            "feedback": [specific feedback],\n'
+            '            "strengths": [list of strengths],\n'
+            '            "improvements": [list of suggestions]\n'
+            '        }'
+            for section_id in self.section_ids
+        )
+
+        return (
+            f"You are an expert at evaluating business pitches. You need to provide a comprehensive evaluation of "
+            f"{self.description} based on its content.\n\n"
+            f"Here are the evaluation criteria for {self.description}:\n\n"
+            + "\n".join(criteria) +
+            "\nPlease provide:\n"
+            "1. Scores for each section (0-100)\n"
+            "2. Specific feedback for each section\n"
+            "3. An overall score (weighted according to the percentages)\n"
+            "4. Areas of strength\n"
+            "5. Suggestions for improvement\n\n"
+            "Format your response as a JSON object with this structure:\n"
+            "{\n"
+            '    "overall": [overall score],\n'
+            '    "sections": {\n'
+            f"{section_format}\n"
+            "    }\n"
+            "}\n"
+        )
+
+    def build_prompt(self, presentation_text, transcript, extra_context=None):
+        """
+        Build the full evaluation prompt: the static rubric prefix followed by this pitch's content.
+        extra_context is an optional list of (heading, text) blocks appended after the transcript.
+        """
+        parts = [
+            self.prompt_prefix,
+            "Below is the content from a pitch presentation and its transcript. Please evaluate it based on the criteria above.\n",
+            f"PRESENTATION CONTENT:\n{presentation_text}\n",
+            f"PITCH TRANSCRIPT:\n{transcript}\n",
+        ]
+        for heading, text in extra_context or []:
+            parts.append(f"{heading}:\n{text}\n")
+        parts.append("Return only the JSON object with no additional text.")
+        return "\n".join(parts)
+
+    def _render_html_cards(self):
+        cards = []
+        for section in self.sections:
+            levels = "\n".join(
+                f'    <p><span class="rubric-level">{html.escape(band["label"])} ({html.escape(band["range"])}):</span> {html.escape(level)}</p>'
+                for band, level in zip(self.bands, section["levels"])
+            )
+            cards.append(
+                f'<h3 class="text-lg font-semibold mb-3">{html.escape(section["label"])} ({section["weight_label"]})</h3>\n'
+                f'<div class="rubric-card">\n{levels}\n'
+                f'    <div class="rubric-highlight">\n'
+                f'        <p><strong>Key elements:</strong> {html.escape(section["key_elements"])}</p>\n'
+                f'    </div>\n'
+                f'</div>'
+            )
+
+        slides = sorted((section for section in self.sections if section.get("slide")), key=lambda s: s["slide"])
+        if slides:
+            items = "\n".join(
+                f'    <li><strong>Slide {section["slide"]}: {html.escape(section["label"])}</strong> - {html.escape(section["guideline"])}</li>'
+                for section in slides
+            )
+            cards.append(
+                '<h3 class="text-lg font-semibold mb-3">Assignment Guidelines</h3>\n'
+                f'<p>Students should prepare {html.escape(self.description)} with exactly {len(slides)} slides:</p>\n'
+                f'<ol>\n{items}\n</ol>\n'
+                f'<p>Remember to stay within the {self.duration_minutes}-minute time limit and follow the structure outlined in the assignment.</p>'
+            )
+        return cards
+
+    def indicator_coverage(self, text):
+        """Fraction of each keyword section's indicators found in the text."""
+        found = self.matcher.find(text)
+        coverage = {}
+        for section in self.sections:
+            indicators = section.get("indicators")
+            if indicators:
+                coverage[section["id"]] = sum(1 for hit in found if hit[0] == section["id"]) / len(indicators)
+        return coverage
+
+    def score_vector(self, section_scores):
+        """Section scores as a vector in rubric order."""
+        return np.array([section_scores[section_id] for section_id in self.section_ids], dtype=float)
+
+    def weighted_scores(self, section_scores):
+        return self.score_vector(section_scores) * self.weights
+
+    def overall_score(self, section_scores):
+        """Weighted overall score from a mapping of section id to score."""
+        return float(self.score_vector(section_scores) @ self.weights)
+
+    def rating(self, score):
+        """Return the rating band (label, color, ...) a score falls into."""
+        for band in self.bands:
+            if score >= band["min"]:
+                return band
+        return self.bands[-1]
+
+    def feedback_level(self, score):
+        """Which canned feedback ("high" or "low") a section score gets."""
+        return "high" if score >= self.feedback_threshold else "low"
+
+    def suggestion(self, section_id, score):
+        """Canned improvement suggestion for a section at a given score."""
+        return self.section(section_id)["suggestions"][self.feedback_level(score)]
+
+
+def available_rubrics():
+    """Names of the rubric definitions shipped in the rubrics/ directory."""
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(RUBRICS_DIR) if name.endswith(".json"))
+
+
+def load_rubric(name=None):
+    """
+    Load and compile a rubric by name (a file in rubrics/) or path.
+    Defaults to the PITCH_RUBRIC environment variable, then the business pitch rubric.
+    """
+    return _compile_rubric(name or os.environ.get("PITCH_RUBRIC", DEFAULT_RUBRIC))
+
+
+@lru_cache(maxsize=None)
+def _compile_rubric(name):
+    path = name if name.endswith(".json") else os.path.join(RUBRICS_DIR, f"{name}.json")
+    with open(path, encoding="utf-8") as f:
+        definition = json.load(f)
+    return CompiledRubric(name, definition)
@@ -0,0 +1,217 @@
+# scheduler.py
+"""
+Fair admission control for the shared Claude API capacity.
+
+Every Streamlit session in the process goes through one scheduler before
+calling Claude. At most PITCH_MAX_IN_FLIGHT evaluations run at once; the rest
+wait in per-user (or per-course) queues that are served round-robin, so one
+class hitting "Evaluate Pitch" together cannot starve everyone else. Waiters
+are told their queue position and an estimated wait.
+
+When PITCH_SCHEDULER_DIR is set, the same cap is also enforced across worker
+processes on the host with one lock file per slot.
+
+Threads wait with slot(); asyncio code (the HTTP service) waits with
+async_slot(), which queues in the same fair order without holding a thread.
+"""
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; cross-process slots are disabled there
+    fcntl = None
+
+DEFAULT_MAX_IN_FLIGHT = 4
+# Initial guess for how long one evaluation holds a slot, refined as evaluations finish
+DEFAULT_SERVICE_SECONDS = 20.0
+# How often waiters refresh their queue position
+POLL_SECONDS = 1.0
+# How often event-loop waiters check for admission
+ASYNC_POLL_SECONDS = 0.1
+
+
+class _Ticket:
+    __slots__ = ("key", "enqueued")
+
+    def __init__(self, key):
+        self.key = key
+        self.enqueued = time.time()
+
+
+class FairScheduler:
+    """Caps concurrent evaluations and admits waiters round-robin across queue keys."""
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, lock_dir=None):
+        self.max_in_flight = max_in_flight
+        self.lock_dir = lock_dir if fcntl else None
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # key -> deque of waiting tickets, in round-robin order
+        self._in_flight = 0
+        self._service_seconds = DEFAULT_SERVICE_SECONDS
+
+    def _position(self, ticket):
+        """1-based position of a waiting ticket in round-robin admission order."""
+        own_queue = self._queues[ticket.key]
+        own_round = own_queue.index(ticket)
+        own_order = list(self._queues).index(ticket.key)
+        ahead = 0
+        for order, queue in enumerate(self._queues.values()):
+            ahead += min(len(queue), own_round)
+            if len(queue) > own_round and order < own_order:
+                ahead += 1
+        return ahead + 1
+
+    def _eta(self, position):
+        free = self.max_in_flight - self._in_flight
+        if position <= free:
+            return 0.0
+        return math.ceil((position - free) / self.max_in_flight) * self._service_seconds
+
+    def _is_next(self, ticket):
+        head_key = next(iter(self._queues))
+        return head_key == ticket.key and self._queues[head_key][0] is ticket
+
+    def status(self):
+        """Snapshot of the scheduler for display."""
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "waiting": sum(len(queue) for queue in self._queues.values()),
+                "max_in_flight": self.max_in_flight,
+                "service_seconds": self._service_seconds,
+            }
+
+    def _acquire_local(self, ticket, on_wait):
+        with self._cond:
+            self._queues.setdefault(ticket.key, deque()).append(ticket)
+            try:
+                while not (self._in_flight < self.max_in_flight and self._is_next(ticket)):
+                    if on_wait:
+                        position = self._position(ticket)
+                        eta = self._eta(position)
+                        # Report outside the lock so a slow UI update can't stall admissions
+                        self._cond.release()
+                        try:
+                            on_wait(position, eta)
+                        finally:
+                            self._cond.acquire()
+                    self._cond.wait(POLL_SECONDS)
+            except BaseException:
+                self._remove(ticket)
+                self._cond.notify_all()
+                raise
+
+            self._admit(ticket)
+
+    def _admit(self, ticket):
+        self._remove(ticket)
+        self._in_flight += 1
+        # The next waiter may be admissible too
+        self._cond.notify_all()
+
+    def _remove(self, ticket):
+        queue = self._queues[ticket.key]
+        queue.remove(ticket)
+        # Rotate: a key that was just served goes to the back of the round-robin order
+        del self._queues[ticket.key]
+        if queue:
+            self._queues[ticket.key] = queue
+
+    def _release_local(self, seconds):
+        with self._cond:
+            self._in_flight -= 1
+            # Exponentially weighted average of slot hold times for ETAs
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * seconds
+            self._cond.notify_all()
+
+    def _acquire_process_slot(self, on_wait):
+        """Hold one of the host-wide slot lock files; returns the open file."""
+        while True:
+            for slot in range(self.max_in_flight):
+                handle = open(os.path.join(self.lock_dir, f"slot-{slot}.lock"), "w")
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return handle
+                except OSError:
+                    handle.close()
+            if on_wait:
+                on_wait(1, self._service_seconds)
+            # Jittered backoff so workers don't retry in lockstep
+            time.sleep(random.uniform(0.2, 0.6))
+
+    @contextmanager
+    def slot(self, key="default", on_wait=None):
+        """
+        Hold an evaluation slot for the duration of the block.
+        on_wait(position, eta_seconds) is called periodically while queued.
+        """
+        ticket = _Ticket(key)
+        self._acquire_local(ticket, on_wait)
+        handle = None
+        started = time.time()
+        try:
+            if self.lock_dir:
+                handle = self._acquire_process_slot(on_wait)
+                started = time.time()
+            yield
+        finally:
+            if handle:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+            self._release_local(time.time() - started)
+
+
+    @asynccontextmanager
+    async def async_slot(self, key="default", on_wait=None):
+        """Like slot(), for coroutines: waits in the same queues without blocking the event loop."""
+        ticket = _Ticket(key)
+        with self._cond:
+            self._queues.setdefault(ticket.key, deque()).append(ticket)
+        try:
+            while True:
+                with self._cond:
+                    if self._in_flight < self.max_in_flight and self._is_next(ticket):
+                        self._admit(ticket)
+                        break
+                    position = self._position(ticket)
+                    eta = self._eta(position)
+                if on_wait:
+                    on_wait(position, eta)
+                await asyncio.sleep(ASYNC_POLL_SECONDS)
+        except BaseException:
+            with self._cond:
+                self._remove(ticket)
+                self._cond.notify_all()
+            raise
+
+        handle = None
+        started = time.time()
+        try:
+            if self.lock_dir:
+                handle = await asyncio.get_running_loop().run_in_executor(None, self._acquire_process_slot, None)
+                started = time.time()
+            yield
+        finally:
+            if handle:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+            self._release_local(time.time() - started)
+
+
+@lru_cache(maxsize=None)
+def get_scheduler():
+    """Return the process-wide scheduler, configured from the environment."""
+    return FairScheduler(
+        max_in_flight=int(os.environ.get("PITCH_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)),
+        lock_dir=os.environ.get("PITCH_SCHEDULER_DIR") or None,
+    )
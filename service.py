@@ -0,0 +1,353 @@
+# service.py
+"""
+Asynchronous HTTP API for LMS integration, running next to the Streamlit UI.
+
+    POST /submissions                multipart upload: presentation, audio [, course, user, rubric]
+                                     (resubmissions by the same course and user are re-evaluated incrementally)
+    GET  /submissions/{id}           status, queue position and estimated wait
+    GET  /submissions/{id}/result    the evaluation in the {"overall", "sections"} schema
+                                     (while pending, with a provisional local evaluation once extracted)
+
+Uploads are streamed to spooled temporary files, probed from their headers and
+evaluated in the background with the same pipeline as the UI. Extraction and
+the Claude call run in worker threads, while waiting for API capacity happens
+on the event loop through the shared fair scheduler, so a single instance can
+accept hundreds of concurrent submissions.
+
+Run with:  python service.py --port 8080
+"""
+import argparse
+import asyncio
+import hmac
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import anthropic
+from aiohttp import web
+
+from alignment import align_transcript
+from dedup import compute_signature, get_submission_index
+from pipeline import (
+    analyze_presentation_fallback,
+    evaluate_presentation,
+    evaluate_revision,
+    extract_audio_transcript,
+    extract_presentation_slides,
+)
+from probe import probe_audio, probe_presentation
+from rubric import available_rubrics, load_rubric
+from scheduler import get_scheduler
+
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+CHUNK_BYTES = 64 * 1024
+# Uploads smaller than this stay in memory
+SPOOL_BYTES = 2 * 1024 * 1024
+# Concurrent text extractions (CPU-bound work in worker threads)
+MAX_EXTRACTIONS = int(os.environ.get("PITCH_SERVICE_MAX_EXTRACTIONS", 8))
+# Finished jobs are kept this long for clients to collect their results
+JOB_TTL_SECONDS = 24 * 60 * 60
+
+PRESENTATION_EXTENSIONS = (".ppt", ".pptx", ".pdf", ".doc", ".docx")
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".m4a")
+
+
+class Job:
+    """One submission moving through extraction, the API queue and evaluation."""
+
+    def __init__(self, rubric, course, user, presentation, audio):
+        self.id = uuid.uuid4().hex
+        self.rubric = rubric
+        self.course = course
+        self.user = user
+        self.presentation = presentation  # (filename, file)
+        self.audio = audio
+        self.label = presentation[0]  # shown on near-duplicate matches; the file itself is closed after extraction
+        self.duration = None  # recording length from the audio probe
+        self.status = "received"
+        self.position = None
+        self.eta = None
+        self.result = None
+        self.provisional = None
+        self.error = None
+        self.warnings = []
+        self.created = time.time()
+        self.updated = self.created
+
+    @property
+    def queue_key(self):
+        # Same fairness policy as the UI: per course when configured, otherwise per user
+        if os.environ.get("PITCH_FAIR_SHARE", "user") == "course" and self.course:
+            return f"course:{self.course}"
+        return f"user:{self.user or self.course or self.id}"
+
+    def close_files(self):
+        for upload in (self.presentation, self.audio):
+            if upload:
+                upload[1].close()
+        self.presentation = self.audio = None
+
+    def to_status(self):
+        status = {
+            "id": self.id,
+            "status": self.status,
+            "rubric": self.rubric.key,
+            "created": self.created,
+            "updated": self.updated,
+        }
+        if self.status == "queued":
+            status["position"] = self.position
+            status["eta_seconds"] = round(self.eta, 1) if self.eta is not None else None
+        if self.error:
+            status["error"] = self.error
+        if self.warnings:
+            status["warnings"] = self.warnings
+        return status
+
+
+def _error(status, message, **extra):
+    return web.json_response({"error": message, **extra}, status=status)
+
+
+async def _stream_part(part, limit):
+    """Stream one multipart file part to a spooled temporary file without buffering it whole."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    size = 0
+    while True:
+        chunk = await part.read_chunk(CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            spool.close()
+            raise web.HTTPRequestEntityTooLarge(max_size=limit, actual_size=size)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+@web.middleware
+async def token_auth(request, handler):
+    """Require a bearer token when PITCH_SERVICE_TOKEN is set."""
+    token = os.environ.get("PITCH_SERVICE_TOKEN")
+    # Constant-time comparison so the token can't be recovered from response timings
+    if token and not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+        return _error(401, "Missing or invalid bearer token.")
+    return await handler(request)
+
+
+async def submit(request):
+    """Accept a submission, probe it and start its evaluation in the background."""
+    if not request.content_type.startswith("multipart/"):
+        return _error(415, "Submissions must be multipart/form-data uploads.")
+
+    fields = {}
+    uploads = {}
+    rejected = None
+    try:
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name in ("presentation", "audio"):
+                extensions = PRESENTATION_EXTENSIONS if part.name == "presentation" else AUDIO_EXTENSIONS
+                filename = part.filename or ""
+                if not filename.lower().endswith(extensions):
+                    rejected = f"The {part.name} must be one of: {', '.join(extensions)}."
+                    break
+                uploads[part.name] = (filename, await _stream_part(part, MAX_UPLOAD_BYTES))
+            elif part.name in ("course", "user", "rubric"):
+                fields[part.name] = (await part.text()).strip()
+    except BaseException:
+        for _, file in uploads.values():
+            file.close()
+        raise
+
+    missing = [name for name in ("presentation", "audio") if name not in uploads]
+    rubric_name = fields.get("rubric") or None
+    if rejected or missing or (rubric_name and rubric_name not in available_rubrics()):
+        for _, file in uploads.values():
+            file.close()
+        if rejected:
+            return _error(400, rejected)
+        if missing:
+            return _error(400, f"Missing upload: {', '.join(missing)}.")
+        return _error(400, f"Unknown rubric '{rubric_name}'.", rubrics=available_rubrics())
+
+    rubric = load_rubric(rubric_name)
+    job = Job(rubric, fields.get("course"), fields.get("user"), uploads["presentation"], uploads["audio"])
+
+    # Header-only probing takes milliseconds, but PDFs are opened with PyMuPDF, so keep it off the loop
+    loop = asyncio.get_running_loop()
+    reports = await asyncio.gather(
+        loop.run_in_executor(request.app["executor"], probe_presentation, job.presentation[1], job.presentation[0], rubric),
+        loop.run_in_executor(request.app["executor"], probe_audio, job.audio[1], job.audio[0], rubric),
+    )
+    errors = [error for report in reports for error in report["errors"]]
+    if errors:
+        job.close_files()
+        return _error(422, "The uploaded files can't be evaluated.", details=errors)
+    job.warnings = [warning for report in reports for warning in report["warnings"]]
+    job.duration = reports[1].get("duration")
+
+    request.app["jobs"][job.id] = job
+    task = asyncio.create_task(run_job(request.app, job))
+    request.app["tasks"].add(task)
+    task.add_done_callback(request.app["tasks"].discard)
+
+    return web.json_response({
+        **job.to_status(),
+        "status_url": str(request.app.router["status"].url_for(job_id=job.id)),
+        "result_url": str(request.app.router["result"].url_for(job_id=job.id)),
+    }, status=202)
+
+
+def _extract(job):
+    presentation_name, presentation_file = job.presentation
+    audio_name, audio_file = job.audio
+    slides = extract_presentation_slides(presentation_file, presentation_name)
+    transcript = extract_audio_transcript(audio_file, os.path.splitext(audio_name)[1])
+    return slides, transcript
+
+
+def _evaluate(client, job, slides, transcript):
+    presentation_text = "\n".join(slides)
+    timeline = align_transcript(slides, transcript, job.duration, job.rubric)
+
+    # Near-duplicates are looked up and indexed the same way as submissions through the UI
+    submission_index = get_submission_index()
+    presentation_signature = compute_signature(presentation_text)
+    transcript_signature = compute_signature(transcript)
+    duplicates = submission_index.find_near_duplicates(presentation_signature, transcript_signature)
+
+    def evaluate(base_sections=None):
+        try:
+            return evaluate_presentation(
+                client, presentation_text, transcript, job.rubric, base_sections=base_sections, timeline=timeline
+            )
+        except Exception as e:
+            # Same behaviour as the UI: fall back to the simpler analysis method
+            job.warnings.append(f"Error calling Claude API: {e}. The fallback evaluation method was used.")
+            return analyze_presentation_fallback(presentation_text, transcript, job.rubric)
+
+    if job.user:
+        # Only re-evaluate the sections whose slides or transcript changed since the last revision
+        result = evaluate_revision(f"{job.course or ''}:{job.user}", slides, transcript, job.rubric, evaluate)
+    else:
+        result = evaluate()
+    submission_index.add_submission(job.label, presentation_signature, transcript_signature, result)
+    result["duplicates"] = [
+        {key: d[key] for key in ("label", "created", "presentation_similarity", "transcript_similarity")}
+        for d in duplicates
+    ]
+    result["timeline"] = timeline
+    return result
+
+
+async def run_job(app, job):
+    """Extract, wait for API capacity fairly, then evaluate one submission."""
+    loop = asyncio.get_running_loop()
+    executor = app["executor"]
+
+    def on_wait(position, eta):
+        job.position = position
+        job.eta = eta
+
+    try:
+        job.status = "extracting"
+        async with app["extraction_limit"]:
+            slides, transcript = await loop.run_in_executor(executor, _extract, job)
+            # The local evaluation takes milliseconds; clients can show it until Claude's arrives
+            job.provisional = dict(
+                analyze_presentation_fallback("\n".join(slides), transcript, job.rubric), provisional=True
+            )
+        job.close_files()
+
+        job.status = "queued"
+        job.updated = time.time()
+        async with get_scheduler().async_slot(job.queue_key, on_wait=on_wait):
+            job.status = "evaluating"
+            job.updated = time.time()
+            job.result = await loop.run_in_executor(executor, _evaluate, app["client"], job, slides, transcript)
+        job.status = "done"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.close_files()
+        job.updated = time.time()
+
+
+def _get_job(request):
+    job = request.app["jobs"].get(request.match_info["job_id"])
+    if job is None:
+        raise web.HTTPNotFound(text='{"error": "Unknown submission."}', content_type="application/json")
+    return job
+
+
+async def status(request):
+    return web.json_response(_get_job(request).to_status())
+
+
+async def result(request):
+    job = _get_job(request)
+    if job.status == "done":
+        return web.json_response(job.result)
+    if job.status == "failed":
+        return _error(500, job.error or "Evaluation failed.", id=job.id)
+    pending = job.to_status()
+    if job.provisional:
+        pending["provisional"] = job.provisional
+    return web.json_response(pending, status=202)
+
+
+async def health(request):
+    return web.json_response({"status": "ok", "scheduler": get_scheduler().status(), "jobs": len(request.app["jobs"])})
+
+
+async def _expire_jobs(app):
+    while True:
+        await asyncio.sleep(300)
+        cutoff = time.time() - JOB_TTL_SECONDS
+        for job_id, job in list(app["jobs"].items()):
+            if job.status in ("done", "failed") and job.updated < cutoff:
+                del app["jobs"][job_id]
+
+
+async def _startup(app):
+    api_key = os.environ.get("CLAUDE_API_KEY")
+    if not api_key:
+        raise RuntimeError("Claude API key not found. Please set the CLAUDE_API_KEY environment variable.")
+    app["client"] = anthropic.Anthropic(api_key=api_key)
+    # Enough threads for every admitted evaluation plus the extraction limit; queued jobs hold none
+    app["executor"] = ThreadPoolExecutor(max_workers=get_scheduler().max_in_flight + MAX_EXTRACTIONS + 2)
+    app["extraction_limit"] = asyncio.Semaphore(MAX_EXTRACTIONS)
+    app["expiry"] = asyncio.create_task(_expire_jobs(app))
+
+
+async def _cleanup(app):
+    app["expiry"].cancel()
+    for task in list(app["tasks"]):
+        task.cancel()
+    app["executor"].shutdown(wait=False, cancel_futures=True)
+
+
+def create_app():
+    app = web.Application(middlewares=[token_auth])
+    app["jobs"] = {}
+    app["tasks"] = set()
+    app.router.add_post("/submissions", submit)
+    app.router.add_get("/submissions/{job_id}", status, name="status")
+    app.router.add_get("/submissions/{job_id}/result", result, name="result")
+    app.router.add_get("/health", health)
+    app.on_startup.append(_startup)
+    app.on_cleanup.append(_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pitch evaluation HTTP API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
@@ -0,0 +1,193 @@
+# thumbnails.py
+"""
+Low-resolution slide thumbnails for showing each section's feedback next to its slide.
+
+PDF pages are rendered with PyMuPDF at PITCH_THUMBNAIL_DPI and compressed to
+JPEG. PowerPoint decks are first converted to PDF with LibreOffice when it is
+installed. Rendering happens on a shared worker pool, only for the pages that
+are asked for, and thumbnails are cached in memory and on disk by file digest,
+page and DPI, so a deck is never rendered twice for the same view.
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+
+import fitz  # PyMuPDF
+
+DEFAULT_DPI = 48
+JPEG_QUALITY = 70
+DEFAULT_WORKERS = 4
+# Thumbnails kept in memory per process (about 10-30 KB each at the default DPI)
+MEMORY_CACHE_ITEMS = 512
+# Converted decks kept in memory per process
+MEMORY_CACHE_PDFS = 16
+CONVERSION_TIMEOUT_SECONDS = 120
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pitch_evaluator", "thumbnails")
+
+
+def file_digest(data):
+    """Content digest used as the cache key of an uploaded file."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _office_binary():
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+
+class ThumbnailRenderer:
+    """Renders slide thumbnails on a worker pool with a memory and disk cache."""
+
+    def __init__(self, dpi=DEFAULT_DPI, cache_dir=None, max_workers=DEFAULT_WORKERS):
+        self.dpi = dpi
+        self.cache_dir = cache_dir
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # (digest, page, dpi) -> JPEG bytes, least recently used first
+        self._pending = {}  # cache key -> future, so concurrent viewers share one render
+        # digest -> PDF bytes of converted decks, or None when conversion failed; least recently used first
+        self._pdfs = OrderedDict()
+        self._conversion_locks = {}  # digest -> lock held while that deck converts, removed once it ends
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, name) if self.cache_dir else None
+
+    def _read_disk(self, name):
+        path = self._cache_path(name)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        return None
+
+    def _write_disk(self, name, data):
+        path = self._cache_path(name)
+        if path:
+            # Write then rename so a concurrent reader never sees a partial file
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+    def _remember(self, key, image):
+        with self._lock:
+            self._memory[key] = image
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_CACHE_ITEMS:
+                self._memory.popitem(last=False)
+
+    def _convert_to_pdf(self, data, digest, filename):
+        """PDF bytes of a PowerPoint deck, converted once per digest; None without LibreOffice."""
+        cached = self._read_disk(f"{digest}.pdf")
+        if cached:
+            return cached
+        office = _office_binary()
+        if not office:
+            return None
+        with tempfile.TemporaryDirectory() as work_dir:
+            source = os.path.join(work_dir, "deck" + os.path.splitext(filename)[1].lower())
+            with open(source, "wb") as f:
+                f.write(data)
+            try:
+                subprocess.run(
+                    [office, "--headless", "--convert-to", "pdf", "--outdir", work_dir, source],
+                    check=True, capture_output=True, timeout=CONVERSION_TIMEOUT_SECONDS
+                )
+                with open(os.path.join(work_dir, "deck.pdf"), "rb") as f:
+                    pdf = f.read()
+            except (OSError, subprocess.SubprocessError):
+                return None
+        self._write_disk(f"{digest}.pdf", pdf)
+        return pdf
+
+    def _pdf_bytes(self, data, digest, filename):
+        if filename.lower().endswith(".pdf"):
+            return data
+        if not filename.lower().endswith((".ppt", ".pptx")):
+            return None
+        # One conversion per deck: the first page to need it converts, the others wait for it.
+        # Failed or timed-out conversions are remembered too, so LibreOffice isn't run again per page
+        with self._lock:
+            if digest in self._pdfs:
+                self._pdfs.move_to_end(digest)
+                return self._pdfs[digest]
+            conversion_lock = self._conversion_locks.setdefault(digest, threading.Lock())
+        with conversion_lock:
+            with self._lock:
+                if digest in self._pdfs:
+                    return self._pdfs[digest]
+            pdf = self._convert_to_pdf(data, digest, filename)
+            with self._lock:
+                self._pdfs[digest] = pdf
+                while len(self._pdfs) > MEMORY_CACHE_PDFS:
+                    self._pdfs.popitem(last=False)
+                # Pages still waiting hold the lock object itself; later ones find the result above
+                self._conversion_locks.pop(digest, None)
+        return pdf
+
+    def _render(self, data, digest, filename, page, dpi):
+        name = f"{digest}-{page}-{dpi}.jpg"
+        image = self._read_disk(name)
+        if image is None:
+            pdf = self._pdf_bytes(data, digest, filename)
+            if pdf is None:
+                return None
+            # Documents are opened per render; PyMuPDF objects aren't shared between threads
+            try:
+                document = fitz.open(stream=pdf, filetype="pdf")
+            except (RuntimeError, ValueError):
+                return None
+            try:
+                if not 0 <= page < document.page_count:
+                    return None
+                pixmap = document[page].get_pixmap(dpi=dpi)
+                image = pixmap.tobytes("jpg", jpg_quality=JPEG_QUALITY)
+            except (RuntimeError, ValueError):
+                # A page PyMuPDF can't render has no thumbnail, like a deck that can't be converted
+                return None
+            finally:
+                document.close()
+            self._write_disk(name, image)
+        self._remember((digest, page, dpi), image)
+        return image
+
+    def submit(self, data, filename, page, dpi=None, digest=None):
+        """Start rendering one page (0-based) unless cached; returns a future of the JPEG bytes or None."""
+        dpi = dpi or self.dpi
+        digest = digest or file_digest(data)
+        key = (digest, page, dpi)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                future = Future()
+                future.set_result(self._memory[key])
+                return future
+            future = self._pending.get(key)
+            started = future is None
+            if started:
+                future = self._pending[key] = self._executor.submit(self._render, data, digest, filename, page, dpi)
+        if started:
+            # Outside the lock: the callback runs right away if the render has already finished
+            future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+
+@lru_cache(maxsize=None)
+def get_renderer():
+    """Return the process-wide thumbnail renderer, configured from the environment."""
+    return ThumbnailRenderer(
+        dpi=int(os.environ.get("PITCH_THUMBNAIL_DPI", DEFAULT_DPI)),
+        cache_dir=os.environ.get("PITCH_THUMBNAIL_DIR", DEFAULT_CACHE_DIR) or None,
+        max_workers=int(os.environ.get("PITCH_THUMBNAIL_WORKERS", DEFAULT_WORKERS)),
+    )